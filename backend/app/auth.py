@@ -1,27 +1,47 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import time
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select, event, inspect, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app import models
 from app.core.config import settings
-import httpx
+from app.core.cache import TTLCache
+from app.core.executors import BoundedExecutor, ExecutorBusyError
+from app.services import google_token_service
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+BCRYPT_ROUNDS = settings.BCRYPT_ROUNDS
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Verified token payloads, keyed by token digest; entries never outlive the token's exp
+_token_cache = TTLCache("auth_token", max_size=settings.TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# Authenticated users, keyed by "id:<user id>" or "username:<username>"
+_user_cache = TTLCache("auth_user", max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+# bcrypt is deliberately slow; run it on its own small pool so login bursts
+# cannot occupy the threadpool shared by every other sync endpoint
+password_executor = BoundedExecutor(
+    "password_hash",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a bcrypt hash."""
     try:
         return bcrypt.checkpw(
-            plain_password.encode('utf-8'),
+            # Truncate to 72 bytes, as get_password_hash does
+            plain_password.encode('utf-8')[:72],
             hashed_password.encode('utf-8')
         )
     except Exception:
@@ -32,11 +52,45 @@ def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
     # Truncate password to 72 bytes (bcrypt limit)
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a bcrypt hash was made with a different cost than BCRYPT_ROUNDS."""
+    # Format: $2b$<cost>$<salt+hash>
+    parts = hashed_password.split("$")
+    try:
+        return int(parts[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def _password_busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests at the moment. Please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the dedicated password executor."""
+    try:
+        return await password_executor.run(verify_password, plain_password, hashed_password)
+    except ExecutorBusyError:
+        raise _password_busy_exception()
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the dedicated password executor."""
+    try:
+        return await password_executor.run(get_password_hash, password)
+    except ExecutorBusyError:
+        raise _password_busy_exception()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -48,25 +102,98 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+def create_user_access_token(user: models.User) -> str:
+    """Create an access token carrying both the username and the user id"""
+    return create_access_token(
+        data={"sub": user.username, "uid": user.id},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Decode and verify an access token, reusing earlier verifications
+
+    Raises JWTError if the token is invalid or expired.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _token_cache.delete(key)
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        _token_cache.set(key, payload, ttl=min(remaining, _token_cache.ttl))
+    return payload
+
+
+def invalidate_user(user: models.User):
+    """Drop a user from the authenticated-user cache"""
+    _user_cache.delete(f"id:{user.id}")
+    _user_cache.delete(f"username:{user.username}")
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target):
+    invalidate_user(target)
+    # The username may have changed; drop the entry under the old name too
+    for old_username in inspect(target).attrs.username.history.deleted:
+        _user_cache.delete(f"username:{old_username}")
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_by_username(db, username)
     if not user:
         return False
     # OAuth users don't have password_hash
     if not user.password_hash:
         return False
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return False
+    if password_needs_rehash(user.password_hash):
+        # Transparently upgrade the hash to the configured cost
+        user.password_hash = await get_password_hash_async(password)
+        await db.commit()
+    return user
+
+
+async def _get_user_for_token(db: AsyncSession, payload: dict) -> Optional[models.User]:
+    """Resolve a verified token payload to a user, by primary key when the token has one"""
+    user_id = payload.get("uid")
+    username = payload.get("sub")
+    cache_key = f"id:{user_id}" if user_id is not None else f"username:{username}"
+
+    user = _user_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    if user_id is not None:
+        user = await db.get(models.User, user_id)
+        if user is not None and user.username != username:
+            # Token was issued for a different username; treat as invalid
+            return None
+    else:
+        user = await get_user_by_username(db, username=username)
+
+    if user is not None:
+        # Cache a detached instance so no session can later expire it under other requests
+        db.expunge(user)
+        _user_cache.set(cache_key, user)
     return user
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,13 +201,13 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = get_user_by_username(db, username=username)
+    user = await _get_user_for_token(db, payload)
     if user is None:
         raise credentials_exception
     return user
@@ -88,18 +215,17 @@ async def get_current_user(
 
 async def get_current_user_optional(
     token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[models.User]:
     """Get current user if token is provided, otherwise return None"""
     if not token:
         return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             return None
-        user = get_user_by_username(db, username=username)
-        return user
+        return await _get_user_for_token(db, payload)
     except (JWTError, Exception):
         return None
 
@@ -114,42 +240,62 @@ async def verify_google_token(token: str) -> dict:
         )
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Verify token with Google
-            response = await client.get(
-                f"https://oauth2.googleapis.com/tokeninfo?id_token={token}"
-            )
-            response.raise_for_status()
-            user_info = response.json()
-
-            # Verify audience
-            if user_info.get("aud") != settings.GOOGLE_CLIENT_ID:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token audience"
-                )
-
-            return user_info
-    except httpx.HTTPStatusError as e:
+        return await google_token_service.verify_id_token(token, audience=GOOGLE_CLIENT_ID)
+    except google_token_service.GoogleTokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Failed to verify Google token: HTTP {e.response.status_code}"
+            detail=f"Failed to verify Google token: {e}"
         )
-    except httpx.RequestError as e:
+    except google_token_service.GoogleKeysUnavailableError:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Failed to connect to Google OAuth service"
         )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Failed to verify Google token"
-        )
 
 
-def get_user_by_google_id(db: Session, google_id: str):
-    return db.query(models.User).filter(models.User.google_id == google_id).first()
+async def get_user_by_google_id(db: AsyncSession, google_id: str):
+    result = await db.execute(select(models.User).where(models.User.google_id == google_id))
+    return result.scalars().first()
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+
+async def find_conflicting_user(db: AsyncSession, username: str, email: str) -> Optional[models.User]:
+    """Return a user that already has this username or email, in one query"""
+    result = await db.execute(
+        select(models.User).where(
+            or_(models.User.username == username, models.User.email == email)
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def allocate_username(db: AsyncSession, base: str, max_length: int = 50) -> str:
+    """
+    Pick a free username for ``base`` with a single query
+
+    Loads every existing username that starts with ``base`` and returns
+    ``base`` itself or ``base`` plus the lowest free numeric suffix.
+    """
+    escaped = base.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    result = await db.execute(
+        select(models.User.username).where(models.User.username.like(f"{escaped}%", escape="\\"))
+    )
+    taken = set(result.scalars().all())
+    if base not in taken:
+        return base
 
+    suffixes = {
+        int(name[len(base):])
+        for name in taken
+        if name[len(base):].isdigit()
+    }
+    counter = 1
+    while counter in suffixes:
+        counter += 1
+    suffix = str(counter)
+    return f"{base[:max_length - len(suffix)]}{suffix}"
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
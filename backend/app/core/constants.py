@@ -19,6 +19,10 @@ TRANSCRIPTION_METHOD_WHISPER = "whisper"
 TRANSCRIPTION_METHOD_ERROR = "error"
 TRANSCRIPTION_METHOD_UNKNOWN = "unknown"
 
+# Typical answer length per IELTS part, used when the audio duration can't be measured
+EXPECTED_ANSWER_SECONDS = {1: 20, 2: 120, 3: 45}
+DEFAULT_EXPECTED_ANSWER_SECONDS = 60
+
 # Transcription Method Display Names
 TRANSCRIPTION_DISPLAY_GOOGLE = "Google Cloud Speech-to-Text"
 TRANSCRIPTION_DISPLAY_WHISPER = "Whisper (Local)"
@@ -27,6 +31,11 @@ TRANSCRIPTION_DISPLAY_WHISPER = "Whisper (Local)"
 ERROR_QUESTION_NOT_FOUND = "Question not found"
 ERROR_SESSION_NOT_FOUND = "Không tìm thấy phiên luyện tập"
 ERROR_TRANSCRIPTION_FAILED = "Transcription error: {error}. Please check that 'mamba activate whisper' works and Whisper is installed."
+ERROR_TRANSCRIPTION_TIMEOUT = "Transcription did not finish within the time limit. Please try again."
+ERROR_TRANSCRIPTION_BUSY = "Transcription service is busy ({position} jobs ahead). Please try again in about {retry_after} seconds."
+ERROR_IDEMPOTENCY_KEY_INVALID = "Idempotency-Key không hợp lệ (tối đa {max_length} ký tự)"
+ERROR_IDEMPOTENCY_KEY_REUSED = "Idempotency-Key này đã được dùng cho một yêu cầu khác"
+ERROR_IDEMPOTENCY_IN_PROGRESS = "Yêu cầu với Idempotency-Key này vẫn đang được xử lý. Vui lòng thử lại sau."
 
 # Feedback Messages
 FEEDBACK_UNAVAILABLE = """⚠️ **Dịch vụ AI không khả dụng**
@@ -37,6 +46,12 @@ Dịch vụ phản hồi AI hiện không khả dụng. Vui lòng đảm bảo:
 
 Bản ghi của bạn đã được lưu. Bạn có thể thử lại sau để nhận phản hồi IELTS chi tiết."""
 
+FEEDBACK_NO_TRANSCRIPT = """⚠️ **Không nhận dạng được giọng nói**
+
+Không thể chuyển bản ghi thành văn bản nên bài nói chưa được chấm điểm.
+
+Bản ghi của bạn đã được lưu. Vui lòng thử ghi âm lại."""
+
 FEEDBACK_ERROR_TEMPLATE = """⚠️ **Lỗi tạo phản hồi**
 
 Đã xảy ra lỗi khi tạo phản hồi: {error}
@@ -0,0 +1,94 @@
+"""
+Per-request deadlines propagated through async call chains
+
+A handler starts a deadline once at the edge; every stage below reads
+the remaining budget from a context variable instead of using its own
+fixed timeout, and skips or degrades when too little time is left.
+Context variables are copied into asyncio.to_thread calls, so the
+deadline is also visible in worker threads.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional, Union
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage has too little of the request's budget left to run"""
+
+    def __init__(self, stage: str, remaining: float):
+        super().__init__(f"Not enough time left for {stage} ({remaining:.1f}s remaining)")
+        self.stage = stage
+        self.remaining = remaining
+
+
+class Deadline:
+    """An absolute point in time by which the request must be answered"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def has(self, seconds: float) -> bool:
+        """Whether at least ``seconds`` of budget remain"""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Remaining budget, optionally capped by a stage's own maximum"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(remaining, cap)
+
+    def check(self, stage: str, needed: float = 0.0):
+        """Raise DeadlineExceeded unless ``needed`` seconds remain for ``stage``"""
+        remaining = self.remaining()
+        if remaining <= needed:
+            raise DeadlineExceeded(stage, remaining)
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the request being handled, if one was started"""
+    return _current_deadline.get()
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """Remaining budget of the current deadline, or ``default`` when there is none"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    return deadline.remaining()
+
+
+def stage_timeout(cap: float) -> float:
+    """Timeout for a stage: its own cap, shortened to the current deadline if there is one"""
+    deadline = _current_deadline.get()
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+@contextmanager
+def deadline_scope(deadline: Union[float, Deadline]):
+    """
+    Run the enclosed code under a deadline
+
+    Pass a number of seconds to start a new deadline, or an existing
+    Deadline to carry it into code running in another context (e.g. a
+    streaming response body).
+    """
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
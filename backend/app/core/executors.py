@@ -0,0 +1,93 @@
+"""
+Bounded executors for CPU-heavy work that must not starve request workers
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from app.core.metrics import registry
+
+EXECUTOR_QUEUE_DEPTH = registry.gauge(
+    "executor_queue_depth",
+    "Tasks submitted to a bounded executor that have not finished yet",
+    labelnames=("executor",)
+)
+EXECUTOR_REJECTIONS = registry.counter(
+    "executor_rejections_total",
+    "Tasks rejected because the executor queue was full",
+    labelnames=("executor",)
+)
+EXECUTOR_TASK_SECONDS = registry.histogram(
+    "executor_task_seconds",
+    "Time from submission to completion of an executor task",
+    labelnames=("executor",)
+)
+
+
+class ExecutorBusyError(Exception):
+    """Raised when a bounded executor already has its maximum number of pending tasks"""
+
+    def __init__(self, name: str, pending: int):
+        super().__init__(f"Executor '{name}' is busy ({pending} tasks pending)")
+        self.name = name
+        self.pending = pending
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool with a cap on pending (queued + running) tasks
+
+    Work submitted beyond ``max_workers + max_queue`` is rejected immediately
+    with ExecutorBusyError instead of queueing without limit.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name
+            )
+        return self._executor
+
+    def _release(self, started: float):
+        with self._lock:
+            self._pending -= 1
+        EXECUTOR_QUEUE_DEPTH.dec(executor=self.name)
+        EXECUTOR_TASK_SECONDS.observe(time.perf_counter() - started, executor=self.name)
+
+    async def run(self, func: Callable, *args):
+        """Run ``func(*args)`` on the executor and await its result"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                EXECUTOR_REJECTIONS.inc(executor=self.name)
+                raise ExecutorBusyError(self.name, self._pending)
+            self._pending += 1
+        EXECUTOR_QUEUE_DEPTH.inc(executor=self.name)
+
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._release(started)
+            raise
+        future.add_done_callback(lambda _: self._release(started))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,394 @@
+"""
+Idempotency keys for expensive submissions
+
+Clients send an ``Idempotency-Key`` header (any unique string, e.g. a
+UUID per recording) and reuse it when they retry. The first request with
+a key claims it and runs; a successful response is stored for
+IDEMPOTENCY_TTL_SECONDS. A retry with the same key gets the stored
+response, or waits for the original if it is still running, instead of
+uploading, transcribing, calling Gemini and saving a practice session
+again. A failed request releases its key so that a retry runs again.
+
+Keys are scoped per endpoint and per user (or client address), and bound
+to the request parameters: reusing a key for a different request is a 422.
+Keys live in a backend: in-process memory by default, or Redis so that a
+retry landing on another node is still recognized.
+
+A claim expires after IDEMPOTENCY_CLAIM_TTL_SECONDS unless its request
+renews it, which it does for as long as it runs; a node that dies frees
+its keys within that time. Each claim carries a random token, and only
+its holder can renew, complete or release it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.core.constants import (
+    ERROR_IDEMPOTENCY_IN_PROGRESS,
+    ERROR_IDEMPOTENCY_KEY_INVALID,
+    ERROR_IDEMPOTENCY_KEY_REUSED
+)
+from app.core.metrics import registry
+from app.core.rate_limit import client_identity, oauth2_scheme_optional
+from app.core.responses import DefaultJSONResponse
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENT_REPLAYS = registry.counter(
+    "idempotent_replays_total",
+    "Requests answered with the result of an earlier request with the same Idempotency-Key",
+    labelnames=("scope",)
+)
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: bytes
+    media_type: str
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers={IDEMPOTENT_REPLAY_HEADER: "true"}
+        )
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "token", "expires_at", "result", "done")
+
+    def __init__(self, fingerprint: str, token: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.token = token
+        self.expires_at = expires_at
+        self.result: Optional[StoredResponse] = None
+        self.done = asyncio.Event()
+
+
+class MemoryIdempotencyBackend:
+    """Keys held in this process; least recently used keys are dropped beyond max_keys"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry.done.set()
+            return None
+        return entry
+
+    def _owned(self, key: str, token: str) -> Optional[_Entry]:
+        entry = self._get(key)
+        return entry if entry is not None and entry.token == token else None
+
+    async def begin(self, key: str, fingerprint: str, token: str, ttl: float) -> Optional[str]:
+        """Claim ``key`` with ``token``; returns None if claimed, otherwise the fingerprint of its holder"""
+        entry = self._get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry.fingerprint
+        self._entries[key] = _Entry(fingerprint, token, time.monotonic() + ttl)
+        while len(self._entries) > self.max_keys:
+            _, evicted = self._entries.popitem(last=False)
+            evicted.done.set()
+        return None
+
+    async def wait(self, key: str, timeout: float) -> Optional[StoredResponse]:
+        """The stored response for ``key``; None if it is released or still running after ``timeout``"""
+        entry = self._get(key)
+        if entry is None:
+            return None
+        try:
+            await asyncio.wait_for(entry.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return entry.result
+
+    async def refresh(self, key: str, token: str, ttl: float) -> bool:
+        """Extend a claim ``token`` still holds; False if it expired or was taken over"""
+        entry = self._owned(key, token)
+        if entry is None:
+            return False
+        entry.expires_at = time.monotonic() + ttl
+        return True
+
+    async def complete(self, key: str, token: str, fingerprint: str, response: StoredResponse, ttl: float):
+        entry = self._owned(key, token)
+        if entry is None:
+            return
+        entry.result = response
+        entry.expires_at = time.monotonic() + ttl
+        entry.done.set()
+
+    async def release(self, key: str, token: str):
+        if self._owned(key, token) is None:
+            return
+        entry = self._entries.pop(key)
+        entry.done.set()
+
+    async def close(self):
+        pass
+
+
+# Run a command only while ARGV[1] is the token of the claim stored at KEYS[1]
+_REDIS_IF_OWNED = """
+local value = redis.call('GET', KEYS[1])
+if not value or cjson.decode(value)['token'] ~= ARGV[1] then
+  return 0
+end
+"""
+_REDIS_REFRESH = _REDIS_IF_OWNED + "redis.call('PEXPIRE', KEYS[1], ARGV[2])\nreturn 1"
+_REDIS_COMPLETE = _REDIS_IF_OWNED + "redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])\nreturn 1"
+_REDIS_RELEASE = _REDIS_IF_OWNED + "redis.call('DEL', KEYS[1])\nreturn 1"
+
+
+class RedisIdempotencyBackend:
+    """
+    Keys shared between nodes through Redis
+
+    A claim is a SET NX that expires after ``ttl`` if its node dies;
+    retries on other nodes poll for the stored response. Fails open: if
+    Redis is unreachable requests run as if they had no key.
+    """
+
+    def __init__(self, url: str, prefix: str = "idempotency:", poll_interval: float = 0.5):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("IDEMPOTENCY_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+        self._client = redis_asyncio.from_url(url)
+        self._refresh = self._client.register_script(_REDIS_REFRESH)
+        self._complete = self._client.register_script(_REDIS_COMPLETE)
+        self._release = self._client.register_script(_REDIS_RELEASE)
+
+    async def _load(self, key: str) -> Optional[dict]:
+        value = await self._client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def begin(self, key: str, fingerprint: str, token: str, ttl: float) -> Optional[str]:
+        try:
+            for _ in range(2):
+                claimed = await self._client.set(
+                    self.prefix + key,
+                    json.dumps({"fingerprint": fingerprint, "token": token}),
+                    nx=True,
+                    px=int(ttl * 1000)
+                )
+                if claimed:
+                    return None
+                existing = await self._load(key)
+                if existing is not None:
+                    return existing["fingerprint"]
+                # Released between the two calls; try to claim it again
+        except Exception as e:
+            logger.warning(f"Idempotency backend unavailable, running request: {e}")
+        return None
+
+    async def wait(self, key: str, timeout: float) -> Optional[StoredResponse]:
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                existing = await self._load(key)
+                if existing is None:
+                    return None
+                if "status_code" in existing:
+                    return StoredResponse(
+                        status_code=existing["status_code"],
+                        body=existing["body"].encode(),
+                        media_type=existing["media_type"]
+                    )
+                if time.monotonic() >= deadline:
+                    return None
+                await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+        except Exception as e:
+            logger.warning(f"Idempotency backend unavailable: {e}")
+            return None
+
+    async def refresh(self, key: str, token: str, ttl: float) -> bool:
+        try:
+            return bool(await self._refresh(keys=[self.prefix + key], args=[token, int(ttl * 1000)]))
+        except Exception as e:
+            logger.warning(f"Could not renew idempotency key: {e}")
+            # Keep running; the claim is retried on the next renewal
+            return True
+
+    async def complete(self, key: str, token: str, fingerprint: str, response: StoredResponse, ttl: float):
+        try:
+            await self._complete(keys=[self.prefix + key], args=[token, json.dumps({
+                "fingerprint": fingerprint,
+                "token": token,
+                "status_code": response.status_code,
+                "body": response.body.decode(),
+                "media_type": response.media_type,
+            }), int(ttl * 1000)])
+        except Exception as e:
+            logger.warning(f"Could not store idempotent response: {e}")
+
+    async def release(self, key: str, token: str):
+        try:
+            await self._release(keys=[self.prefix + key], args=[token])
+        except Exception as e:
+            logger.warning(f"Could not release idempotency key: {e}")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_backend = None
+
+
+def get_idempotency_backend():
+    global _backend
+    if _backend is None:
+        if settings.IDEMPOTENCY_BACKEND == "redis":
+            _backend = RedisIdempotencyBackend(settings.IDEMPOTENCY_REDIS_URL)
+        else:
+            _backend = MemoryIdempotencyBackend(max_keys=settings.IDEMPOTENCY_MAX_KEYS)
+    return _backend
+
+
+def set_idempotency_backend(backend):
+    """Replace the backend, e.g. with a shared one configured at startup"""
+    global _backend
+    _backend = backend
+
+
+async def close_idempotency_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def _fingerprint(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def _keep_claim(backend, key: str, token: str, ttl: float):
+    """Renew a claim until cancelled, so a long job never outlives it"""
+    while True:
+        await asyncio.sleep(ttl / 3)
+        if not await backend.refresh(key, token, ttl):
+            logger.warning("Idempotency claim expired or was taken over while its request was still running")
+            return
+
+
+class IdempotentRequest:
+    """One request's view of its Idempotency-Key (``key`` is None without one)"""
+
+    def __init__(self, scope: str, key: Optional[str]):
+        self.scope = scope
+        self.key = key
+
+    async def run(self, compute: Callable[[], Awaitable[Any]], **params) -> Any:
+        """
+        Result of ``compute()``, or the stored result of an earlier request with the same key
+
+        ``params`` identify the request (form fields, upload name and size);
+        a key reused with different params is rejected with 422.
+        """
+        if self.key is None:
+            return await compute()
+
+        backend = get_idempotency_backend()
+        fingerprint = _fingerprint(params)
+        token = uuid.uuid4().hex
+        claim_ttl = settings.IDEMPOTENCY_CLAIM_TTL_SECONDS
+
+        holder = await backend.begin(self.key, fingerprint, token, claim_ttl)
+        if holder is not None:
+            if holder != fingerprint:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=ERROR_IDEMPOTENCY_KEY_REUSED)
+            stored = await backend.wait(self.key, settings.IDEMPOTENCY_WAIT_SECONDS)
+            if stored is not None:
+                IDEMPOTENT_REPLAYS.inc(scope=self.scope)
+                return stored.to_response()
+            # Either the original failed and released the key, or it is still running
+            if await backend.begin(self.key, fingerprint, token, claim_ttl) is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=ERROR_IDEMPOTENCY_IN_PROGRESS,
+                    headers={"Retry-After": "5"}
+                )
+
+        keeper = asyncio.create_task(_keep_claim(backend, self.key, token, claim_ttl))
+        try:
+            result = await compute()
+        except BaseException:
+            keeper.cancel()
+            await backend.release(self.key, token)
+            raise
+        keeper.cancel()
+
+        # Serialized the way FastAPI would, so the replay is byte-for-byte the same
+        response = result if isinstance(result, Response) else DefaultJSONResponse(jsonable_encoder(result))
+        if 200 <= response.status_code < 300 and hasattr(response, "body"):
+            await backend.complete(
+                self.key,
+                token,
+                fingerprint,
+                StoredResponse(response.status_code, bytes(response.body), response.media_type),
+                settings.IDEMPOTENCY_TTL_SECONDS
+            )
+        else:
+            await backend.release(self.key, token)
+        return response
+
+
+class Idempotency:
+    """
+    Dependency adding Idempotency-Key support to an endpoint
+
+    Usage:
+        analyze_idempotency = Idempotency("practice_analyze")
+
+        @router.post("/analyze")
+        async def analyze(..., idempotent: IdempotentRequest = Depends(analyze_idempotency)):
+            return await idempotent.run(do_the_work, question_id=question_id, part=part)
+
+    Replayed responses carry an ``Idempotent-Replayed: true`` header.
+    """
+
+    def __init__(self, scope: str):
+        self.scope = scope
+
+    async def __call__(
+        self,
+        request: Request,
+        token: Optional[str] = Depends(oauth2_scheme_optional)
+    ) -> IdempotentRequest:
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None or not settings.IDEMPOTENCY_ENABLED:
+            return IdempotentRequest(self.scope, None)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_IDEMPOTENCY_KEY_INVALID.format(max_length=MAX_KEY_LENGTH)
+            )
+        return IdempotentRequest(self.scope, f"{self.scope}:{client_identity(request, token)}:{key}")
@@ -0,0 +1,248 @@
+"""
+Admission-controlled job queue for long CPU-bound jobs (e.g. Whisper)
+
+At most ``max_concurrency`` jobs run at once and at most ``max_queue``
+wait behind them; anything beyond that is rejected immediately with
+QueueFullError so overload turns into fast 503s instead of every job
+slowing down together.
+
+Waiting jobs are started shortest-expected-first with aging: a job's
+priority is its expected run time minus ``aging_factor`` times how long
+it has waited, so short jobs overtake long ones without long ones
+starving.
+"""
+import asyncio
+import contextvars
+import itertools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.metrics import registry
+from app.core.tracing import span
+
+# Jobs run for seconds to minutes (Whisper times out at 5 minutes)
+JOB_SECONDS_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+JOB_QUEUE_DEPTH = registry.gauge(
+    "job_queue_depth",
+    "Jobs waiting for a free slot",
+    labelnames=("queue",)
+)
+JOB_QUEUE_RUNNING = registry.gauge(
+    "job_queue_running",
+    "Jobs currently running",
+    labelnames=("queue",)
+)
+JOB_QUEUE_REJECTIONS = registry.counter(
+    "job_queue_rejections_total",
+    "Jobs rejected because the queue was full",
+    labelnames=("queue",)
+)
+JOB_QUEUE_WAIT_SECONDS = registry.histogram(
+    "job_queue_wait_seconds",
+    "Time a job waited for a slot before it started",
+    labelnames=("queue",),
+    buckets=JOB_SECONDS_BUCKETS
+)
+JOB_QUEUE_RUN_SECONDS = registry.histogram(
+    "job_queue_run_seconds",
+    "Time a job ran once it had a slot",
+    labelnames=("queue",),
+    buckets=JOB_SECONDS_BUCKETS
+)
+
+
+class QueueFullError(Exception):
+    """Raised when a job queue already holds its maximum number of waiting jobs"""
+
+    def __init__(self, name: str, position: int, retry_after: float):
+        super().__init__(f"Queue '{name}' is full (a new job would be at position {position})")
+        self.name = name
+        self.position = position
+        self.retry_after = retry_after
+
+
+def queue_full_exception(error: QueueFullError, detail: str) -> HTTPException:
+    """503 telling the client roughly when to retry and where it would have queued"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={
+            "Retry-After": str(max(1, math.ceil(error.retry_after))),
+            "X-Queue-Position": str(error.position),
+        },
+    )
+
+
+@dataclass(eq=False)
+class _Waiter:
+    future: asyncio.Future
+    enqueued: float
+    expected_seconds: float
+    seq: int
+
+
+class JobQueue:
+    """
+    Priority queue with a fixed number of run slots, running jobs on its own threads
+
+    A slot is released only when the job's thread finishes, even if the
+    awaiting request was cancelled, so running jobs never exceed the limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        expected_run_seconds: float = 30.0,
+        aging_factor: float = 1.0
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.aging_factor = aging_factor
+        self._running = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Moving average of run time, used for Retry-After hints and jobs without an estimate
+        self._avg_run_seconds = expected_run_seconds
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "waiting": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_run_seconds": round(self._avg_run_seconds, 2),
+        }
+
+    def estimated_wait(self, position: int) -> float:
+        """Rough seconds until a job at ``position`` in the queue would start"""
+        return math.ceil(position / self.max_concurrency) * self._avg_run_seconds
+
+    def priority(self, waiter: _Waiter, now: float) -> float:
+        """Lower starts first: expected run time minus credit for time waited"""
+        return waiter.expected_seconds - self.aging_factor * (now - waiter.enqueued)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix=self.name
+            )
+        return self._executor
+
+    async def _acquire(self, expected_seconds: float):
+        if self._running < self.max_concurrency and not self._waiters:
+            self._running += 1
+            JOB_QUEUE_RUNNING.set(self._running, queue=self.name)
+            return
+
+        position = len(self._waiters) + 1
+        if position > self.max_queue:
+            JOB_QUEUE_REJECTIONS.inc(queue=self.name)
+            raise QueueFullError(self.name, position, self.estimated_wait(position))
+
+        waiter = _Waiter(
+            future=asyncio.get_running_loop().create_future(),
+            enqueued=time.perf_counter(),
+            expected_seconds=expected_seconds,
+            seq=next(self._seq)
+        )
+        self._waiters.append(waiter)
+        JOB_QUEUE_DEPTH.set(len(self._waiters), queue=self.name)
+        try:
+            # _release hands its slot over directly, so _running is already counted
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                JOB_QUEUE_DEPTH.set(len(self._waiters), queue=self.name)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed to us just as we were cancelled; pass it on
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            # The queue is at most max_queue long, so a linear scan is cheap
+            now = time.perf_counter()
+            waiter = min(self._waiters, key=lambda w: (self.priority(w, now), w.seq))
+            self._waiters.remove(waiter)
+            JOB_QUEUE_DEPTH.set(len(self._waiters), queue=self.name)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self._running -= 1
+        JOB_QUEUE_RUNNING.set(self._running, queue=self.name)
+
+    def _finish(self, started: float):
+        run_seconds = time.perf_counter() - started
+        JOB_QUEUE_RUN_SECONDS.observe(run_seconds, queue=self.name)
+        self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * run_seconds
+        self._release()
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        expected_seconds: Optional[float] = None,
+        wait_timeout: Optional[float] = None
+    ):
+        """
+        Wait for a slot, then run ``func(*args)`` on the queue's threads
+
+        ``expected_seconds`` is the caller's estimate of the run time, used
+        for shortest-job-first ordering (defaults to the recent average).
+        Raises QueueFullError without waiting if the queue is full, and
+        asyncio.TimeoutError if no slot frees up within ``wait_timeout``.
+        Like asyncio.to_thread, ``func`` runs in a copy of the caller's
+        context, so spans it opens attach to the request.
+        """
+        if expected_seconds is None:
+            expected_seconds = self._avg_run_seconds
+        enqueued = time.perf_counter()
+        with span("queue_wait", queue=self.name):
+            if wait_timeout is None:
+                await self._acquire(expected_seconds)
+            else:
+                await asyncio.wait_for(self._acquire(expected_seconds), wait_timeout)
+        started = time.perf_counter()
+        JOB_QUEUE_WAIT_SECONDS.observe(started - enqueued, queue=self.name)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(contextvars.copy_context().run, func, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        def on_done(_):
+            try:
+                loop.call_soon_threadsafe(self._finish, started)
+            except RuntimeError:
+                # Event loop already closed (shutdown); nothing left to release to
+                pass
+
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -1,13 +1,28 @@
 """
 Custom middleware for the application
+
+Everything here is pure ASGI rather than BaseHTTPMiddleware, which runs
+each request in an extra task and re-wraps the response stream.
 """
+import contextvars
+import gzip
 import logging
-from fastapi import Request
+import re
+import time
+import uuid
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.metrics import registry
 
 logger = logging.getLogger(__name__)
 
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
 
 def setup_cors_middleware(app):
     """
@@ -19,6 +34,8 @@ def setup_cors_middleware(app):
         allow_credentials=settings.allow_credentials,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Let browser clients read the pagination cursor of list endpoints
+        expose_headers=["X-Next-Cursor"],
     )
 
     if settings.is_development and settings.CORS_ALLOW_ALL:
@@ -27,12 +44,229 @@ def setup_cors_middleware(app):
         logger.info(f"CORS: Allowing origins: {settings.allowed_origins}")
 
 
-async def cors_debug_middleware(request: Request, call_next):
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CORSDebugMiddleware:
+    """Log the origin of cross-origin requests (added only when CORS_DEBUG is set)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            origin = _header(scope, b"origin")
+            if origin:
+                logger.debug(f"CORS request from origin: {origin}")
+        await self.app(scope, receive, send)
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Accept caller-supplied ids only if they are short and header-safe
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    """The id of the request being handled, if RequestIDMiddleware is enabled"""
+    return _current_request_id.get()
+
+
+class RequestIDMiddleware:
     """
-    Debug middleware to log CORS requests
+    Give every request an id and echo it in the X-Request-ID response header
+
+    Reuses the id sent by the caller (e.g. the proxy) when it is valid, so
+    logs and traces can be correlated across services.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header(scope, REQUEST_ID_HEADER)
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request_id.reset(token)
+
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, until the last body byte is sent",
+    labelnames=("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled",
+    labelnames=("method",)
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency
+
+    Routes are labelled by their path template (e.g. /api/practice/feedback/{session_id})
+    so label cardinality stays bounded; unmatched paths share one label.
     """
-    origin = request.headers.get("origin")
-    if origin:
-        logger.debug(f"CORS request from origin: {origin}")
-    response = await call_next(request)
-    return response
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec(method=method)
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=route_label,
+                status=status_code
+            )
+
+# Server-sent events must reach the client as they are produced
+_UNCOMPRESSED_TYPES = (b"text/event-stream",)
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"image/svg+xml")
+
+
+def parse_accept_encoding(value: Optional[str]) -> dict:
+    """Map each accepted content coding to its q-value"""
+    codings = {}
+    for item in (value or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best coding we support for an Accept-Encoding header: br, then gzip, else None"""
+    codings = parse_accept_encoding(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    candidates = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = codings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip compression for complete responses above a size threshold
+
+    Only responses sent as a single body message are compressed (JSON and
+    other rendered responses). Streamed responses such as SSE, audio files
+    and other StreamingResponses pass through untouched, so they are never
+    buffered.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(_header(scope, b"accept-encoding"))
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body is compressible
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = list(start.get("headers", []))
+            if message.get("more_body", False) or not self._compressible(headers, body):
+                await send(start)
+                await send(message)
+                return
+
+            headers = [(k, v) for k, v in headers if k != b"content-length"]
+            headers.append((b"vary", b"Accept-Encoding"))
+            if encoding is not None:
+                body = _compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, headers, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for key, value in headers:
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value
+        if content_type.startswith(_UNCOMPRESSED_TYPES):
+            return False
+        return content_type.startswith(_COMPRESSIBLE_TYPES)
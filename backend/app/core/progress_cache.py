@@ -0,0 +1,285 @@
+"""
+Per-user cache of computed progress responses
+
+Progress data only changes when update_all_progress() runs, so the
+serialized responses of the progress endpoints are cached per user, keyed
+by endpoint, parameters and today's date. Every user has a version:
+update_all_progress() marks the user on its session, and once that
+transaction commits the version is bumped, so entries stored under the
+old version are never read again. A reader takes the version in the same
+lookup as the entry, before it queries; a response computed from
+pre-commit data can therefore only be stored under the old version.
+
+Backends: an in-process LRU bounded by the total size of the cached
+bodies (default), or Redis so that every node shares entries and versions.
+The memory backend only sees bumps from its own process: with several
+workers or replicas, the others serve cached responses until their TTL
+runs out, so its default TTL is short; use Redis for multi-process setups.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from app.core.cache import CACHE_REQUESTS
+from app.core.config import settings
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding the users whose progress the transaction changed
+_CHANGED_USERS = "progress_changed_users"
+
+
+class _UserEntry:
+    __slots__ = ("version", "responses", "size")
+
+    def __init__(self, version: int):
+        self.version = version
+        self.responses: Dict[str, Tuple[float, bytes]] = {}
+        self.size = 0
+
+
+class MemoryProgressCacheBackend:
+    """
+    Entries held in this process, grouped per user
+
+    Least recently used users are dropped once the cached bodies exceed
+    max_bytes. Versions come from one process-wide counter, so a user who
+    was dropped and comes back never reuses a version a reader may hold.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_users: int = 100_000):
+        self.max_bytes = max_bytes
+        self.max_users = max_users
+        self.size = 0
+        self._users: "OrderedDict[int, _UserEntry]" = OrderedDict()
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _entry(self, user_id: int) -> _UserEntry:
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = _UserEntry(next(self._versions))
+            if len(self._users) > self.max_users:
+                _, evicted = self._users.popitem(last=False)
+                self.size -= evicted.size
+        self._users.move_to_end(user_id)
+        return entry
+
+    async def lookup(self, user_id: int, key: str) -> Tuple[int, Optional[bytes]]:
+        """The user's current version and the body cached for ``key`` under it, if any"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(user_id)
+            cached = entry.responses.get(key)
+            if cached is None:
+                return entry.version, None
+            expires_at, body = cached
+            if expires_at <= now:
+                del entry.responses[key]
+                entry.size -= len(body)
+                self.size -= len(body)
+                return entry.version, None
+            return entry.version, body
+
+    async def store(self, user_id: int, version: int, key: str, body: bytes, ttl: float):
+        """Cache ``body``, unless the user's version moved on while it was computed"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry.version != version:
+                return
+            previous = entry.responses.get(key)
+            if previous is not None:
+                entry.size -= len(previous[1])
+                self.size -= len(previous[1])
+            entry.responses[key] = (time.monotonic() + ttl, body)
+            entry.size += len(body)
+            self.size += len(body)
+            self._users.move_to_end(user_id)
+            while self.size > self.max_bytes and self._users:
+                _, evicted = self._users.popitem(last=False)
+                self.size -= evicted.size
+
+    async def bump(self, user_id: int):
+        with self._lock:
+            entry = self._users.pop(user_id, None)
+            if entry is not None:
+                self.size -= entry.size
+            # Keep the slot (with a new version) so in-flight readers cannot store into it
+            self._users[user_id] = _UserEntry(next(self._versions))
+
+    async def close(self):
+        pass
+
+
+# Current version and the entry stored under it, in one round trip
+_REDIS_LOOKUP = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ':' .. ARGV[2])}
+"""
+
+
+class RedisProgressCacheBackend:
+    """
+    Entries and versions shared between nodes through Redis
+
+    Entries are keyed by version and expire on their TTL, so a bump (one
+    INCR) is all invalidation takes. Fails open: if Redis is unreachable
+    every lookup is a miss.
+    """
+
+    def __init__(self, url: str, prefix: str = "progress:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("PROGRESS_CACHE_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._lookup = self._client.register_script(_REDIS_LOOKUP)
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.prefix}version:{user_id}"
+
+    def _entry_prefix(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}:"
+
+    async def lookup(self, user_id: int, key: str) -> Tuple[int, Optional[bytes]]:
+        try:
+            version, body = await self._lookup(keys=[self._version_key(user_id)], args=[self._entry_prefix(user_id), key])
+        except Exception as e:
+            logger.warning(f"Progress cache backend unavailable: {e}")
+            return -1, None
+        return int(version), body
+
+    async def store(self, user_id: int, version: int, key: str, body: bytes, ttl: float):
+        if version < 0:
+            return
+        try:
+            await self._client.set(f"{self._entry_prefix(user_id)}{version}:{key}", body, px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Progress cache backend unavailable: {e}")
+
+    async def bump(self, user_id: int):
+        try:
+            await self._client.incr(self._version_key(user_id))
+        except Exception as e:
+            logger.warning(f"Could not invalidate cached progress for user {user_id}: {e}")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_backend = None
+
+
+def get_progress_cache_backend():
+    global _backend
+    if _backend is None:
+        if settings.PROGRESS_CACHE_BACKEND == "redis":
+            _backend = RedisProgressCacheBackend(settings.PROGRESS_CACHE_REDIS_URL)
+        else:
+            # uvicorn/gunicorn take their default worker count from WEB_CONCURRENCY
+            if int(os.getenv("WEB_CONCURRENCY", "1") or 1) > 1:
+                logger.warning(
+                    "PROGRESS_CACHE_BACKEND=memory with several workers: other workers may serve progress "
+                    f"up to {settings.PROGRESS_CACHE_TTL_SECONDS:.0f}s stale. Use PROGRESS_CACHE_BACKEND=redis."
+                )
+            _backend = MemoryProgressCacheBackend(max_bytes=settings.PROGRESS_CACHE_MAX_BYTES)
+    return _backend
+
+
+def set_progress_cache_backend(backend):
+    """Replace the backend, e.g. with a shared one configured at startup"""
+    global _backend
+    _backend = backend
+
+
+async def close_progress_cache_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def _cache_key(name: str, params: Optional[dict]) -> str:
+    # Today's date is part of every key: calendars and "today" counters roll over at midnight
+    parts = [name, date.today().isoformat()]
+    parts.extend(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    return "|".join(parts)
+
+
+async def cached_progress(
+    user_id: int,
+    name: str,
+    params: Optional[dict],
+    compute: Callable[[], Awaitable[bytes]]
+) -> bytes:
+    """
+    The serialized response ``name`` for a user, from the cache or ``compute()``
+
+    ``params`` are the request parameters the response depends on.
+    """
+    if not settings.PROGRESS_CACHE_ENABLED:
+        return await compute()
+    backend = get_progress_cache_backend()
+    key = _cache_key(name, params)
+    version, body = await backend.lookup(user_id, key)
+    if body is not None:
+        CACHE_REQUESTS.inc(cache="progress", result="hit")
+        return body
+    CACHE_REQUESTS.inc(cache="progress", result="miss")
+    body = await compute()
+    await backend.store(user_id, version, key, body, settings.PROGRESS_CACHE_TTL_SECONDS)
+    return body
+
+
+async def invalidate_progress(user_id: int):
+    """Drop every cached progress response of a user"""
+    await get_progress_cache_backend().bump(user_id)
+
+
+def mark_progress_changed(db: Session, user_id: int):
+    """Invalidate the user's cached progress once ``db``'s transaction commits"""
+    db.info.setdefault(_CHANGED_USERS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    user_ids = session.info.pop(_CHANGED_USERS, None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        coro = invalidate_progress(user_id)
+        try:
+            # AsyncSession commits run the sync Session in a greenlet that can await
+            await_only(coro)
+        except MissingGreenlet:
+            coro.close()
+            # A plain sync Session, e.g. from a threadpool route or a script
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                asyncio.run(invalidate_progress(user_id))
+            else:
+                logger.warning(f"Cached progress for user {user_id} not invalidated: commit outside an async session")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    session.info.pop(_CHANGED_USERS, None)
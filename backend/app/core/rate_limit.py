@@ -0,0 +1,226 @@
+"""
+Token-bucket rate limiting for expensive endpoints
+
+Each limited endpoint gets a per-user bucket and a global bucket. Buckets
+live in a backend: in-process memory by default, or Redis so that every
+node of a multi-node deployment shares the same budget.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by a rate limit, by limit name and scope (user or global)",
+    labelnames=("limit", "scope")
+)
+
+_PERIODS = {"second": 1, "sec": 1, "s": 1, "minute": 60, "min": 60, "m": 60, "hour": 3600, "h": 3600}
+
+
+@dataclass(frozen=True)
+class Rate:
+    """A bucket refilled at ``capacity`` tokens per ``period`` seconds, holding at most ``capacity``"""
+    capacity: int
+    period: float
+
+    @property
+    def per_second(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(spec: str) -> Optional[Rate]:
+    """Parse "10/minute" style specs; empty or zero disables the limit"""
+    spec = (spec or "").strip().lower()
+    if not spec:
+        return None
+    count, _, period = spec.partition("/")
+    try:
+        capacity = int(count)
+        seconds = _PERIODS[period.strip() or "second"]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{spec}', expected e.g. '10/minute'")
+    if capacity <= 0:
+        return None
+    return Rate(capacity=capacity, period=seconds)
+
+
+class MemoryRateLimitBackend:
+    """Buckets held in this process; least recently used keys are dropped beyond max_keys"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        """Take ``cost`` tokens; returns (allowed, seconds until enough tokens are available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(rate.capacity), now))
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate.per_second
+        return allowed, retry_after
+
+    async def close(self):
+        pass
+
+
+# Atomic refill-and-take; returns {allowed, retry-after in ms}
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local per_ms = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * per_ms)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = math.ceil((cost - tokens) / per_ms)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / per_ms))
+return {allowed, retry}
+"""
+
+
+class RedisRateLimitBackend:
+    """Buckets shared between nodes through Redis; fails open if Redis is unreachable"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def take(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        try:
+            allowed, retry_ms = await self._script(
+                keys=[self.prefix + key],
+                args=[rate.capacity, rate.per_second / 1000, int(time.time() * 1000), cost]
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+            return True, 0.0
+        return bool(allowed), retry_ms / 1000
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_backend = None
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _backend = MemoryRateLimitBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    return _backend
+
+
+def set_rate_limit_backend(backend):
+    """Replace the backend, e.g. with a shared one configured at startup"""
+    global _backend
+    _backend = backend
+
+
+async def close_rate_limit_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
+
+
+def client_identity(request: Request, token: Optional[str]) -> str:
+    """User id from a valid token, otherwise the client address"""
+    if token:
+        from app.auth import decode_access_token
+        try:
+            payload = decode_access_token(token)
+            user = payload.get("uid") or payload.get("sub")
+            if user is not None:
+                return f"user:{user}"
+        except JWTError:
+            pass
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+class RateLimit:
+    """
+    Dependency enforcing a per-user and a global token bucket for one endpoint
+
+    Usage:
+        @router.post("/analyze", dependencies=[Depends(RateLimit("analyze", "10/minute", "120/minute"))])
+
+    Rejected requests get 429 with a Retry-After header. Anonymous callers
+    are limited per client address.
+    """
+
+    def __init__(self, name: str, per_user: str, global_limit: str):
+        self.name = name
+        self.per_user = parse_rate(per_user)
+        self.global_limit = parse_rate(global_limit)
+
+    async def __call__(self, request: Request, token: Optional[str] = Depends(oauth2_scheme_optional)):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        backend = get_rate_limit_backend()
+
+        # Per-user first, so one user's burst doesn't spend the global budget
+        if self.per_user is not None:
+            identity = client_identity(request, token)
+            allowed, retry_after = await backend.take(f"{self.name}:{identity}", self.per_user)
+            if not allowed:
+                self._reject("user", retry_after)
+
+        if self.global_limit is not None:
+            allowed, retry_after = await backend.take(f"{self.name}:global", self.global_limit)
+            if not allowed:
+                self._reject("global", retry_after)
+
+    def _reject(self, scope: str, retry_after: float):
+        RATE_LIMIT_REJECTIONS.inc(limit=self.name, scope=scope)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Bạn đã gửi quá nhiều yêu cầu. Vui lòng thử lại sau.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
@@ -0,0 +1,87 @@
+"""
+Fast JSON responses
+
+DefaultJSONResponse is the app-wide response class: orjson when it is
+installed, the standard library encoder otherwise. trusted_json() is for
+hot endpoints whose output is already typed: it serializes with
+pydantic-core directly and skips FastAPI's response_model validation.
+etag_json() does the same and lets clients revalidate with If-None-Match.
+"""
+import hashlib
+import logging
+from typing import Any, Dict
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # noqa: F401
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not installed, using the standard JSON encoder. Install with: pip install orjson")
+
+DefaultJSONResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _adapter(annotation) -> TypeAdapter:
+    adapter = _adapters.get(annotation)
+    if adapter is None:
+        adapter = _adapters[annotation] = TypeAdapter(annotation)
+    return adapter
+
+
+def dump_json(content, annotation=None) -> bytes:
+    """Serialize schema models with pydantic-core, e.g. to cache the bytes"""
+    return _adapter(annotation or type(content)).dump_json(content)
+
+
+def trusted_json(content, annotation=None, status_code: int = 200) -> Response:
+    """
+    JSON response for output built from schema models (e.g. via model_construct)
+
+    The route's response_model still documents the shape; returning a
+    Response directly means FastAPI neither re-validates nor re-encodes it.
+    Pass ``annotation`` for containers, e.g. List[schemas.FeedbackHistoryItem].
+    """
+    return Response(content=dump_json(content, annotation), status_code=status_code, media_type="application/json")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): only the opaque tags have to match
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+def etag_response(request: Request, body: bytes) -> Response:
+    """
+    JSON response for an already serialized body, with a weak ETag
+
+    The tag is a hash of the uncompressed body; it is weak because
+    CompressionMiddleware may send the same JSON gzip- or br-encoded, and
+    those byte-different representations must not share a strong validator.
+
+    Returns 304 Not Modified with no body when the client's If-None-Match
+    already has it. ``Cache-Control: private, no-cache`` lets the browser
+    keep the response but makes it revalidate on every use.
+    """
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def etag_json(request: Request, content, annotation=None) -> Response:
+    """trusted_json() with a weak ETag derived from the body (see etag_response)"""
+    return etag_response(request, dump_json(content, annotation))
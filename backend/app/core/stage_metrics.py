@@ -0,0 +1,55 @@
+"""
+Per-stage metrics for the analyze pipeline
+
+Stages: upload_write, audio_decode, transcription, feedback, db_commit.
+The engine label says what did the work (disk, ffprobe, google, whisper,
+gemini, local, database) and the outcome label how it ended. Each stage
+is also recorded as a trace span named "<stage>.<engine>", which shows
+up in the Server-Timing header.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+
+from app.core.deadline import DeadlineExceeded
+from app.core.job_queue import JOB_SECONDS_BUCKETS, QueueFullError
+from app.core.metrics import registry
+from app.core.tracing import span
+
+STAGE_SECONDS = registry.histogram(
+    "analyze_stage_seconds",
+    "Duration of each analyze pipeline stage by engine and outcome (ok, error, timeout, rejected)",
+    labelnames=("stage", "engine", "outcome"),
+    buckets=(0.005, 0.025, 0.05) + JOB_SECONDS_BUCKETS
+)
+TRANSCRIPTION_FALLBACKS = registry.counter(
+    "transcription_fallbacks_total",
+    "Transcriptions that fell back from one engine to another",
+    labelnames=("from_engine", "to_engine")
+)
+FEEDBACK_FALLBACKS = registry.counter(
+    "feedback_fallbacks_total",
+    "Feedback produced without Gemini, by reason (deadline, unavailable, error, no_transcript)",
+    labelnames=("reason",)
+)
+
+
+@contextmanager
+def stage_timer(stage: str, engine: str):
+    """Observe the enclosed block as one run of ``stage`` on ``engine``"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        with span(f"{stage}.{engine}", stage=True):
+            yield
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        outcome = "timeout"
+        raise
+    except QueueFullError:
+        outcome = "rejected"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, engine=engine, outcome=outcome)
@@ -0,0 +1,198 @@
+"""
+Lightweight request tracing
+
+Each request gets a tree of spans (routers, services, DB statements)
+held in a context variable, so spans opened in awaited code, in
+asyncio.to_thread workers and in SQLAlchemy's greenlets all attach to
+the right parent. Finished traces are exported as one JSON log line or
+POSTed to a local collector, and spans marked as stages are summarised
+in the Server-Timing response header.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.middleware import current_request_id
+
+logger = logging.getLogger("app.tracing")
+
+
+class Span:
+    """A timed operation with attributes and child spans"""
+
+    __slots__ = ("name", "attributes", "children", "start", "end", "stage", "error")
+
+    def __init__(self, name: str, attributes: Optional[dict] = None, stage: bool = False):
+        self.name = name
+        self.attributes = attributes or {}
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        # Stage spans are reported in Server-Timing
+        self.stage = stage
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def to_dict(self, origin: float) -> dict:
+        data = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in list(self.children)]
+        return data
+
+
+class Trace:
+    """All spans of one request, rooted at the request span"""
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(name, attributes)
+
+    def stages(self) -> Dict[str, float]:
+        """Total milliseconds per finished stage span, in first-seen order"""
+        totals: Dict[str, float] = {}
+        pending = [self.root]
+        while pending:
+            span = pending.pop(0)
+            if span.stage and span.end is not None:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+            pending.extend(list(span.children))
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: finished stages plus the time so far"""
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.stages().items()]
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> dict:
+        return {"trace_id": self.trace_id, **self.root.to_dict(self.root.start)}
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, stage: bool = False, **attributes):
+    """
+    Record the enclosed block as a child of the current span
+
+    Does nothing outside a traced request. Use stage=True for top-level
+    pipeline stages that should appear in Server-Timing.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes, stage=stage)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Start a new trace for the enclosed block (one per request)"""
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        trace.root.finish()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def export_trace(trace: Trace):
+    """Send a finished trace to the configured exporter"""
+    if trace.root.duration_ms < settings.TRACING_EXPORT_MIN_MS:
+        return
+    exporter = settings.TRACING_EXPORTER
+    if exporter == "log":
+        logger.info(json.dumps(trace.to_dict(), default=str))
+    elif exporter == "http" and settings.TRACING_COLLECTOR_URL:
+        # Fire and forget; the response must never wait on the collector
+        asyncio.get_running_loop().create_task(_post_trace(trace.to_dict()))
+
+
+async def _post_trace(payload: dict):
+    from app.core.http import get_http_client
+    try:
+        await get_http_client().post(settings.TRACING_COLLECTOR_URL, json=payload, timeout=2.0)
+    except Exception as e:
+        logger.debug(f"Trace export failed: {e}")
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware tracing each HTTP request
+
+    Adds a Server-Timing header with the stages finished before the
+    response started (for streamed responses, the stages before the
+    first byte) and exports the full trace when the response is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with start_trace(f"{scope['method']} {scope['path']}") as trace:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    # Name the trace after the route template once routing has happened
+                    trace.root.name = f"{scope['method']} {route.path}"
+                    trace.root.attributes["path"] = scope["path"]
+                request_id = current_request_id()
+                if request_id:
+                    trace.root.attributes["request_id"] = request_id
+
+        export_trace(trace)
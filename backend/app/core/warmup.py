@@ -0,0 +1,174 @@
+"""
+Startup warm-up and readiness
+
+The lifespan handler starts warm_up() in the background: it opens pool
+connections, imports the speech/LLM SDKs and creates their clients,
+resolves the Whisper environment and, optionally, runs Whisper once on a
+short silent clip. /api/health keeps answering (liveness) while this
+runs; /api/health/ready only reports ready once it is done, so the load
+balancer does not route traffic to a cold node.
+
+A failed optional step (no Google credentials, no Gemini key, no mamba)
+is recorded but does not block readiness. A failed required step (the
+database) is retried with exponential backoff until it succeeds, so a
+database that is briefly unavailable at boot delays readiness instead of
+failing it for the life of the process.
+"""
+import asyncio
+import logging
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Steps that must succeed before the node reports ready
+REQUIRED_STEPS = {"database"}
+
+# First delay before retrying a failed required step; doubles up to WARMUP_RETRY_MAX_DELAY_SECONDS
+RETRY_INITIAL_DELAY_SECONDS = 1.0
+
+
+class WarmupState:
+    """Progress and outcome of the startup warm-up"""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def ready(self) -> bool:
+        if not settings.WARMUP_ENABLED:
+            return True
+        return self.done and all(
+            self.steps.get(name, {}).get("status") == "ok" for name in REQUIRED_STEPS
+        )
+
+    def to_dict(self) -> dict:
+        if not settings.WARMUP_ENABLED:
+            status = "ready"
+        elif not self.done:
+            status = "warming_up"
+        else:
+            status = "ready" if self.ready else "not_ready"
+        data = {"status": status, "steps": self.steps}
+        if self.done and self.started_at is not None:
+            data["warmup_seconds"] = round(self.finished_at - self.started_at, 3)
+        return data
+
+
+warmup_state = WarmupState()
+
+
+async def _warm_database() -> dict:
+    from app.database import warm_pools
+    return await warm_pools(settings.WARMUP_DB_CONNECTIONS)
+
+
+async def _warm_google_speech() -> Optional[dict]:
+    from app.services.google_speech_service import GOOGLE_SPEECH_AVAILABLE, get_speech_client
+    if not GOOGLE_SPEECH_AVAILABLE:
+        return None
+    # Imports the SDK and builds the gRPC channel
+    if await asyncio.to_thread(get_speech_client) is None:
+        raise RuntimeError("Google Cloud Speech client could not be created")
+    return {}
+
+
+async def _warm_gemini() -> Optional[dict]:
+    from app.services.gemini_feedback_service import GEMINI_AVAILABLE, get_gemini_client
+    if not GEMINI_AVAILABLE or not settings.GEMINI_API_KEY:
+        return None
+    # Imports the SDK, configures it and builds (and possibly caches) the examiner model
+    if await asyncio.to_thread(get_gemini_client) is None:
+        raise RuntimeError("Gemini client could not be created")
+    return {}
+
+
+async def _warm_google_keys() -> Optional[dict]:
+    from app.services.google_token_service import get_key_cache
+    if not settings.GOOGLE_CLIENT_ID:
+        return None
+    await get_key_cache().warm()
+    return {}
+
+
+def _silent_wav(path: Path, seconds: float = 1.0, rate: int = 16000):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+
+
+async def _warm_whisper() -> Optional[dict]:
+    from app.services import whisper_service
+    mamba_base = await asyncio.to_thread(whisper_service.get_mamba_base)
+    if not settings.WARMUP_INFERENCE:
+        return {"mamba_base": mamba_base}
+    # Loads the model once so its weights are in the page cache for the first real job
+    with tempfile.TemporaryDirectory(prefix="whisper-warmup-") as workdir:
+        clip = Path(workdir) / "warmup.wav"
+        _silent_wav(clip)
+        await whisper_service.whisper_queue.run(
+            whisper_service.transcribe_audio, clip, Path(workdir), expected_seconds=5
+        )
+    return {"mamba_base": mamba_base, "inference": True}
+
+
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[Optional[dict]]]] = {
+    "database": _warm_database,
+    "google_speech": _warm_google_speech,
+    "gemini": _warm_gemini,
+    "google_keys": _warm_google_keys,
+    "whisper": _warm_whisper,
+}
+
+
+async def _run_step(state: WarmupState, name: str, step: Callable[[], Awaitable[Optional[dict]]]) -> dict:
+    start = time.perf_counter()
+    try:
+        details = await asyncio.wait_for(step(), settings.WARMUP_STEP_TIMEOUT_SECONDS)
+        result = {"status": "skipped"} if details is None else {"status": "ok", **details}
+    except asyncio.TimeoutError:
+        result = {"status": "failed", "error": f"timed out after {settings.WARMUP_STEP_TIMEOUT_SECONDS:.0f}s"}
+    except Exception as e:
+        result = {"status": "failed", "error": str(e)}
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    state.steps[name] = result
+    log = logger.warning if result["status"] == "failed" else logger.info
+    log(f"Warm-up step {name}: {result['status']} in {result['seconds']}s")
+    return result
+
+
+async def _run_required_step(state: WarmupState, name: str, step: Callable[[], Awaitable[Optional[dict]]]):
+    """Run ``step`` until it succeeds, backing off between attempts"""
+    delay = RETRY_INITIAL_DELAY_SECONDS
+    attempt = 1
+    while (await _run_step(state, name, step))["status"] == "failed":
+        state.steps[name].update(status="retrying", attempt=attempt, retry_in=delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.WARMUP_RETRY_MAX_DELAY_SECONDS)
+        attempt += 1
+
+
+async def warm_up(state: WarmupState = warmup_state):
+    """Run all warm-up steps concurrently and mark the node ready when they finish"""
+    state.started_at = time.perf_counter()
+    state.finished_at = None
+    state.steps = {name: {"status": "running"} for name in WARMUP_STEPS}
+    await asyncio.gather(*(
+        (_run_required_step if name in REQUIRED_STEPS else _run_step)(state, name, step)
+        for name, step in WARMUP_STEPS.items()
+    ))
+    state.finished_at = time.perf_counter()
+    logger.info(f"Warm-up finished in {state.finished_at - state.started_at:.2f}s: {state.to_dict()['status']}")
@@ -1,11 +1,136 @@
-from sqlalchemy import create_engine
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import registry
+from app.core.tracing import span
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+# Connection pool metrics, labelled by pool ("sync" or "async")
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    labelnames=("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+POOL_OVERFLOW_EVENTS = registry.counter(
+    "db_pool_overflow_total",
+    "Connections opened beyond pool_size (overflow connections)",
+    labelnames=("pool",)
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT",
+    labelnames=("pool",)
+)
+POOL_INVALIDATIONS = registry.counter(
+    "db_pool_invalidations_total",
+    "Connections discarded as stale or broken (e.g. by pre-ping)",
+    labelnames=("pool",)
+)
+POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connections currently in use", labelnames=("pool",))
+POOL_OVERFLOW = registry.gauge("db_pool_overflow", "Overflow connections currently open", labelnames=("pool",))
+POOL_SIZE = registry.gauge("db_pool_size", "Configured pool size", labelnames=("pool",))
+
+
+class InstrumentedPoolMixin:
+    """Records checkout wait time, overflow and timeout events for a QueuePool"""
+    pool_label = "sync"
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(pool=self.pool_label)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, pool=self.pool_label)
+        if self._overflow > overflow_before and self._overflow > 0:
+            POOL_OVERFLOW_EVENTS.inc(pool=self.pool_label)
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pool_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pool_label = "async"
+
+
+def _pool_options(poolclass) -> dict:
+    """Pool sizing options shared by the sync and async engines"""
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _engine_options(url: str) -> dict:
+    """Build create_engine keyword arguments from settings"""
+    if url.startswith("sqlite"):
+        # SQLite uses SQLAlchemy's default pool; sizing options do not apply
+        return {"connect_args": {"check_same_thread": False}}
+
+    options = _pool_options(InstrumentedQueuePool)
+    if url.startswith("postgresql") and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        }
+    return options
+
+
+def _watch_pool(engine, label: str):
+    """Export live pool gauges and count invalidated connections for an engine"""
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        POOL_INVALIDATIONS.inc(pool=label)
+
+    if isinstance(engine.pool, QueuePool):
+        POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout(), pool=label)
+        POOL_OVERFLOW.set_function(lambda: max(engine.pool.overflow(), 0), pool=label)
+        POOL_SIZE.set_function(lambda: engine.pool.size(), pool=label)
+
+
+def _trace_statements(engine):
+    """Record each SQL statement as a span of the current request's trace"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        # Only the statement text is recorded, never the bound parameters
+        statement_span = span("db.query", statement=statement[:200], executemany=executemany)
+        statement_span.__enter__()
+        conn.info.setdefault("trace_spans", []).append(statement_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().__exit__(None, None, None)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+        if spans:
+            error = context.original_exception
+            spans.pop().__exit__(type(error), error, None)
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_watch_pool(engine, "sync")
+_trace_statements(engine)
 
 Base = declarative_base()
 
@@ -16,3 +141,136 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async engine (SQLAlchemy asyncio + asyncpg / aiosqlite)
+# Created lazily so the async drivers are only needed once a router uses get_async_db.
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_database_url(url: str = DATABASE_URL):
+    """Map the configured sync DATABASE_URL onto its async driver"""
+    url = make_url(url)
+    if url.drivername in ("postgresql", "postgresql+psycopg2", "postgres"):
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def _async_engine_options(url) -> dict:
+    """Build create_async_engine keyword arguments from settings"""
+    if url.drivername.startswith("sqlite"):
+        return {}
+
+    options = _pool_options(InstrumentedAsyncQueuePool)
+    connect_args = {}
+    if url.drivername == "postgresql+asyncpg":
+        # asyncpg takes server settings instead of libpq's "options" string
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        # asyncpg does not understand libpq's sslmode query parameter
+        sslmode = url.query.get("sslmode")
+        if sslmode:
+            connect_args["ssl"] = sslmode
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def get_async_engine():
+    """Get or create the async engine"""
+    global _async_engine, _AsyncSessionLocal
+
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+        url = get_async_database_url()
+        options = _async_engine_options(url)
+        _async_engine = create_async_engine(url.difference_update_query(["sslmode"]), **options)
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=_async_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False  # avoid implicit IO when reading attributes after commit
+        )
+        _watch_pool(_async_engine.sync_engine, "async")
+        _trace_statements(_async_engine.sync_engine)
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    """Get the async session factory, creating the async engine on first use"""
+    get_async_engine()
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    """Async counterpart of get_db for routers on the async request path"""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Close all pooled async connections (called on application shutdown)"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
+
+
+async def warm_pools(connections: int) -> dict:
+    """
+    Open ``connections`` connections on each engine and return them to the pool
+
+    Called during startup so the first requests after a deploy do not pay
+    for connection setup. Returns the pool stats afterwards.
+    """
+    connections = max(1, min(connections, settings.DB_POOL_SIZE))
+
+    def warm_sync():
+        opened = []
+        try:
+            # Hold them all at once so the pool really grows to ``connections``
+            for _ in range(connections):
+                conn = engine.connect()
+                opened.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            for conn in opened:
+                conn.close()
+
+    await asyncio.to_thread(warm_sync)
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            conn = await stack.enter_async_context(get_async_engine().connect())
+            await conn.execute(text("SELECT 1"))
+    return get_pool_stats()
+
+
+def get_pool_stats() -> dict:
+    """Current connection pool usage, for health checks and pool sizing"""
+    stats = {"sync": _pool_snapshot(engine.pool, "sync")}
+    if _async_engine is not None:
+        stats["async"] = _pool_snapshot(_async_engine.sync_engine.pool, "async")
+    return stats
+
+
+def _pool_snapshot(pool, label: str) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "overflow_events": POOL_OVERFLOW_EVENTS.value(pool=label),
+        "checkout_timeouts": POOL_TIMEOUTS.value(pool=label),
+        "invalidations": POOL_INVALIDATIONS.value(pool=label),
+        "checkout_wait_count": POOL_CHECKOUT_WAIT.count(pool=label),
+        "checkout_wait_seconds_total": round(POOL_CHECKOUT_WAIT.sum(pool=label), 6),
+    }
@@ -1,25 +1,81 @@
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from app.routers import auth, questions, practice, mock_test, progress, users, transcription, feedback
 from app.core.config import settings
-from app.core.middleware import setup_cors_middleware, cors_debug_middleware
+from app.core.middleware import (
+    setup_cors_middleware,
+    CompressionMiddleware,
+    CORSDebugMiddleware,
+    RequestIDMiddleware,
+    RequestMetricsMiddleware,
+)
+from app.core.tracing import TracingMiddleware
+from app.core.metrics import registry, CONTENT_TYPE
+from app.core.responses import DefaultJSONResponse
+from app.database import get_pool_stats, dispose_async_engine
+from app.auth import password_executor
+from app.services.whisper_service import whisper_queue
+from app.services.tts_service import TTS_OUTPUT_DIR
+from app.core.http import close_http_client
+from app.core.rate_limit import close_rate_limit_backend
+from app.core.progress_cache import close_progress_cache_backend
+from app.core.idempotency import close_idempotency_backend
+from app.core.warmup import warm_up, warmup_state
 import logging
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION)
 
-# Mount static files for audio uploads
-if settings.UPLOAD_DIR.parent.exists():
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: create the upload directories here rather than at import time
+    settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    TTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    # Warm up in the background so liveness answers while readiness waits
+    warmup_task = asyncio.create_task(warm_up()) if settings.WARMUP_ENABLED else None
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    # Shutdown: close pooled connections and the password hashing pool
+    await dispose_async_engine()
+    await close_http_client()
+    await close_rate_limit_backend()
+    await close_progress_cache_backend()
+    await close_idempotency_backend()
+    password_executor.shutdown(wait=False)
+    whisper_queue.shutdown(wait=False)
+
+
+app = FastAPI(
+    title=settings.APP_NAME,
+    version=settings.APP_VERSION,
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse
+)
+
+# Mount static files for audio uploads (the directory is created in lifespan)
+app.mount("/uploads", StaticFiles(directory="uploads", check_dir=False), name="uploads")
 
 # Setup CORS middleware
 setup_cors_middleware(app)
 
-# CORS debugging middleware (optional, for troubleshooting)
-@app.middleware("http")
-async def cors_debug(request: Request, call_next):
-    return await cors_debug_middleware(request, call_next)
+# Optional pure ASGI middleware, each added only when configured.
+# add_middleware wraps what is already there, so the last one added runs first.
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+if settings.CORS_DEBUG:
+    app.add_middleware(CORSDebugMiddleware)
+if settings.METRICS_ENABLED:
+    # Outside CORS so it times the full request
+    app.add_middleware(RequestMetricsMiddleware)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+if settings.REQUEST_ID_ENABLED:
+    # Outermost, so traces and logs of the whole request see the id
+    app.add_middleware(RequestIDMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -39,9 +95,34 @@ async def root():
 
 @app.get("/api/health")
 async def health():
+    """Liveness: the process is up and serving requests"""
     return {"status": "healthy"}
 
 
+@app.get("/api/health/ready")
+async def health_ready():
+    """Readiness: 503 until the startup warm-up has finished, so no traffic reaches a cold node"""
+    return JSONResponse(
+        status_code=200 if warmup_state.ready else 503,
+        content=warmup_state.to_dict()
+    )
+
+
+@app.get("/api/health/db")
+async def health_db():
+    """Connection pool usage, for sizing the pool against uvicorn worker counts"""
+    return get_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Set the header directly; media_type would get a second charset appended
+    return Response(content=registry.render(), headers={"Content-Type": CONTENT_TYPE})
+
+
 @app.get("/api/cors-test")
 async def cors_test(request: Request):
     """Test endpoint to verify CORS is working"""
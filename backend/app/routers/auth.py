@@ -1,72 +1,68 @@
-from datetime import timedelta
-import random
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app import models, schemas, auth
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    # Check if user exists
-    db_user = auth.get_user_by_username(db, username=user.username)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # Check if username or email is taken (one query)
+    db_user = await auth.find_conflicting_user(db, username=user.username, email=user.email)
     if db_user:
+        if db_user.username == user.username:
+            raise HTTPException(status_code=400, detail="Username already registered")
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create new user
-    hashed_password = auth.get_password_hash(user.password)
+    # Create new user and initialize streak in one transaction
+    hashed_password = await auth.get_password_hash_async(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
         password_hash=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    # Initialize streak
-    streak = models.Streak(user_id=db_user.id)
-    db.add(streak)
-    db.commit()
+    try:
+        await db.flush()
+        db.add(models.Streak(user_id=db_user.id))
+        await db.commit()
+    except IntegrityError:
+        # A concurrent registration took the username or email
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    await db.refresh(db_user)
     
     return db_user
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = auth.create_user_access_token(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+async def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
     return current_user
 
 
 @router.post("/google", response_model=schemas.Token)
 async def google_auth(
     token_request: schemas.GoogleTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Authenticate or register user with Google OAuth token."""
     # Verify Google token
@@ -83,17 +79,17 @@ async def google_auth(
         )
     
     # Check if user exists by Google ID
-    user = auth.get_user_by_google_id(db, google_id=google_id)
+    user = await auth.get_user_by_google_id(db, google_id=google_id)
     
     if not user:
         # Check if user exists by email (for account linking)
-        user = auth.get_user_by_email(db, email=email)
+        user = await auth.get_user_by_email(db, email=email)
         
         if user:
             # Link Google account to existing user
             user.google_id = google_id
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
         else:
             # Create new user
             # Generate username from email or name
@@ -113,37 +109,47 @@ async def google_auth(
             # Limit username length to 50 characters (database constraint)
             username_base = username_base[:47]  # Leave room for counter suffix
             
-            username = username_base
-            counter = 1
-            
-            # Ensure unique username
-            while auth.get_user_by_username(db, username):
-                username = f"{username_base}{counter}"
-                counter += 1
-                # Prevent infinite loop (max 999 users with same base)
-                if counter > 999:
-                    username = f"{username_base}{random.randint(1000, 9999)}"
-                    break
-            
-            user = models.User(
-                username=username,
-                email=email,
-                google_id=google_id,
-                password_hash=None  # OAuth users don't have password
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            
-            # Initialize streak
-            streak = models.Streak(user_id=user.id)
-            db.add(streak)
-            db.commit()
+            # Allocate a unique username in one query and create the user
+            user = await _create_google_user(db, username_base, email, google_id)
     
     # Generate JWT token
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = auth.create_user_access_token(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
+
+async def _create_google_user(
+    db: AsyncSession,
+    username_base: str,
+    email: str,
+    google_id: str,
+    max_attempts: int = 3
+) -> models.User:
+    """Create a Google user and its streak in one transaction, retrying if the username is taken concurrently"""
+    for attempt in range(max_attempts):
+        username = await auth.allocate_username(db, username_base)
+        user = models.User(
+            username=username,
+            email=email,
+            google_id=google_id,
+            password_hash=None  # OAuth users don't have password
+        )
+        db.add(user)
+        try:
+            await db.flush()
+            db.add(models.Streak(user_id=user.id))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            # The same Google account may have been registered by a concurrent request
+            existing = await auth.get_user_by_google_id(db, google_id=google_id)
+            if existing:
+                return existing
+            continue
+        await db.refresh(user)
+        return user
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Could not allocate a username, please try again"
+    )
+
@@ -2,7 +2,7 @@
 Feedback router - handles IELTS feedback generation endpoints
 """
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 import os
@@ -10,13 +10,21 @@ import logging
 
 from app.services.gemini_feedback_service import (
     get_ielts_feedback,
+    stream_ielts_feedback,
     format_feedback_text,
+    IELTSFeedback,
     GEMINI_AVAILABLE,
-    get_gemini_client
+    get_gemini_client,
+    get_examiner_template
 )
 from app import models, auth
+from app.core.config import settings
+from app.core.rate_limit import RateLimit
+from app.utils.sse import sse_event, SSE_HEADERS
 
 router = APIRouter()
+
+feedback_rate_limit = RateLimit("feedback_analyze", settings.RATE_LIMIT_FEEDBACK_USER, settings.RATE_LIMIT_FEEDBACK_GLOBAL)
 logger = logging.getLogger(__name__)
 
 
@@ -40,6 +48,34 @@ class FeedbackResponse(BaseModel):
     sample_corrections: list
 
 
+def validate_feedback_request(request: FeedbackRequest):
+    if not request.transcription or len(request.transcription.strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Bản ghi quá ngắn. Vui lòng cung cấp câu trả lời dài hơn."
+        )
+    
+    if request.part not in [1, 2, 3]:
+        raise HTTPException(
+            status_code=400,
+            detail="Phần thi phải là 1, 2 hoặc 3"
+        )
+
+
+def to_feedback_response(ielts_feedback: IELTSFeedback) -> FeedbackResponse:
+    return FeedbackResponse(
+        fluency_score=float(ielts_feedback.fluency_score),
+        vocabulary_score=float(ielts_feedback.vocabulary_score),
+        grammar_score=float(ielts_feedback.grammar_score),
+        pronunciation_score=float(ielts_feedback.pronunciation_score),
+        overall_band=float(ielts_feedback.overall_band),
+        feedback=format_feedback_text(ielts_feedback),
+        strengths=ielts_feedback.strengths,
+        improvements=ielts_feedback.improvements,
+        sample_corrections=ielts_feedback.sample_corrections
+    )
+
+
 @router.get("/status")
 async def get_feedback_status():
     """
@@ -69,11 +105,12 @@ async def get_feedback_status():
             "available": gemini_available,
             "error": gemini_error
         },
-        "model": "gemini-2.5-flash" if gemini_available else None
+        "model": settings.GEMINI_MODEL if gemini_available else None,
+        "prompt_template": get_examiner_template().key
     })
 
 
-@router.post("/analyze", response_model=FeedbackResponse)
+@router.post("/analyze", response_model=FeedbackResponse, dependencies=[Depends(feedback_rate_limit)])
 async def analyze_transcription(
     request: FeedbackRequest,
     current_user: models.User = Depends(auth.get_current_user)
@@ -91,17 +128,7 @@ async def analyze_transcription(
     Returns:
         FeedbackResponse with IELTS scores and detailed feedback
     """
-    if not request.transcription or len(request.transcription.strip()) < 10:
-        raise HTTPException(
-            status_code=400,
-            detail="Bản ghi quá ngắn. Vui lòng cung cấp câu trả lời dài hơn."
-        )
-    
-    if request.part not in [1, 2, 3]:
-        raise HTTPException(
-            status_code=400,
-            detail="Phần thi phải là 1, 2 hoặc 3"
-        )
+    validate_feedback_request(request)
     
     try:
         ielts_feedback = await get_ielts_feedback(
@@ -116,17 +143,7 @@ async def analyze_transcription(
                 detail="Dịch vụ phản hồi không khả dụng. Vui lòng kiểm tra cấu hình GEMINI_API_KEY."
             )
         
-        return FeedbackResponse(
-            fluency_score=float(ielts_feedback.fluency_score),
-            vocabulary_score=float(ielts_feedback.vocabulary_score),
-            grammar_score=float(ielts_feedback.grammar_score),
-            pronunciation_score=float(ielts_feedback.pronunciation_score),
-            overall_band=float(ielts_feedback.overall_band),
-            feedback=format_feedback_text(ielts_feedback),
-            strengths=ielts_feedback.strengths,
-            improvements=ielts_feedback.improvements,
-            sample_corrections=ielts_feedback.sample_corrections
-        )
+        return to_feedback_response(ielts_feedback)
         
     except HTTPException:
         raise
@@ -137,3 +154,36 @@ async def analyze_transcription(
             detail=f"Không thể tạo phản hồi: {str(e)}"
         )
 
+
+@router.post("/analyze/stream", dependencies=[Depends(feedback_rate_limit)])
+async def analyze_transcription_stream(
+    request: FeedbackRequest,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Streaming variant of /analyze using Server-Sent Events
+
+    Events:
+        score: {"name", "value"} for each band score, as soon as it is generated
+        field: {"name", "value"} for feedback, strengths, improvements and sample_corrections
+        result: the same body /analyze returns, once the full response is validated
+        error: {"detail"} if no feedback could be produced
+    """
+    validate_feedback_request(request)
+
+    async def event_stream():
+        async for event, data in stream_ielts_feedback(
+            transcription=request.transcription,
+            question=request.question,
+            part=request.part
+        ):
+            if event != "result":
+                yield sse_event(event, data)
+            elif data is None:
+                yield sse_event("error", {
+                    "detail": "Dịch vụ phản hồi không khả dụng. Vui lòng kiểm tra cấu hình GEMINI_API_KEY."
+                })
+            else:
+                yield sse_event("result", to_feedback_response(data).model_dump())
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,7 +1,8 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 import uuid
 import shutil
@@ -9,10 +10,22 @@ import logging
 import json
 from pathlib import Path
 from decimal import Decimal
-from app.database import get_db
+from app.database import get_async_db, get_async_sessionmaker
 from app import models, schemas, auth
-from app.services.gemini_feedback_service import get_ielts_feedback, format_feedback_text
+from app.services.gemini_feedback_service import (
+    IELTSFeedback,
+    get_ielts_feedback,
+    stream_ielts_feedback,
+    format_feedback_text
+)
 from app.core.config import settings
+from app.core.rate_limit import RateLimit
+from app.core.idempotency import Idempotency, IdempotentRequest
+from app.core.job_queue import QueueFullError, queue_full_exception
+from app.core.deadline import Deadline, DeadlineExceeded, deadline_scope
+from app.core.stage_metrics import stage_timer, FEEDBACK_FALLBACKS
+from app.core.tracing import span
+from app.core.responses import trusted_json
 from app.core.constants import (
     DEFAULT_FLUENCY_SCORE,
     DEFAULT_VOCABULARY_SCORE,
@@ -28,60 +41,72 @@ from app.core.constants import (
     ERROR_QUESTION_NOT_FOUND,
     ERROR_SESSION_NOT_FOUND,
     ERROR_TRANSCRIPTION_FAILED,
+    ERROR_TRANSCRIPTION_BUSY,
+    ERROR_TRANSCRIPTION_TIMEOUT,
     FEEDBACK_UNAVAILABLE,
+    FEEDBACK_NO_TRANSCRIPT,
     FEEDBACK_ERROR_TEMPLATE
 )
 from app.utils.progress import update_all_progress
+from app.utils.sse import sse_event, SSE_HEADERS
 
 router = APIRouter()
 
-# Create uploads directory if it doesn't exist
-settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Each analysis can cost a Google STT call, a Whisper job and a Gemini call
+analyze_rate_limit = RateLimit("practice_analyze", settings.RATE_LIMIT_ANALYZE_USER, settings.RATE_LIMIT_ANALYZE_GLOBAL)
+# Clients retry on timeouts; a repeated Idempotency-Key gets the first session back
+analyze_idempotency = Idempotency("practice_analyze")
 
 
 @router.post("/", response_model=schemas.PracticeSessionResponse)
-def create_practice_session(
+async def create_practice_session(
     session: schemas.PracticeSessionCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     db_session = models.PracticeSession(
         user_id=current_user.id,
         **session.model_dump()
     )
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    await db.commit()
+    await db.refresh(db_session)
 
     # Update all progress metrics
-    update_all_progress(db, current_user.id, session.part)
-    db.commit()
+    await db.run_sync(update_all_progress, current_user.id, session.part)
+    await db.commit()
 
     return db_session
 
 
 @router.get("/", response_model=List[schemas.PracticeSessionResponse])
-def get_practice_sessions(
+async def get_practice_sessions(
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return db.query(models.PracticeSession).filter(
-        models.PracticeSession.user_id == current_user.id
-    ).order_by(models.PracticeSession.created_at.desc()).all()
+    result = await db.execute(
+        select(models.PracticeSession).where(
+            models.PracticeSession.user_id == current_user.id
+        ).order_by(models.PracticeSession.created_at.desc())
+    )
+    return result.scalars().all()
 
 
 @router.get("/question/{question_id}")
-def get_practice_history_by_question(
+async def get_practice_history_by_question(
     question_id: int,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get practice history for a specific question - only returns sessions with audio (submitted for analysis)"""
-    sessions = db.query(models.PracticeSession).filter(
-        models.PracticeSession.user_id == current_user.id,
-        models.PracticeSession.question_id == question_id,
-        models.PracticeSession.audio_url.isnot(None)  # Only count sessions with audio (submitted for analysis)
-    ).order_by(desc(models.PracticeSession.created_at)).all()
+    result = await db.execute(
+        select(models.PracticeSession).where(
+            models.PracticeSession.user_id == current_user.id,
+            models.PracticeSession.question_id == question_id,
+            models.PracticeSession.audio_url.isnot(None)  # Only count sessions with audio (submitted for analysis)
+        ).order_by(desc(models.PracticeSession.created_at))
+    )
+    sessions = result.scalars().all()
 
     return {
         "sessions": sessions,
@@ -89,162 +114,319 @@ def get_practice_history_by_question(
     }
 
 
-@router.post("/analyze")
-async def analyze_audio(
-    audio: UploadFile = File(...),
-    question_id: int = Form(...),
-    part: int = Form(...),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Analyze audio recording and create practice session with scores"""
-
-    # Verify question exists
-    question = db.query(models.Question).filter(models.Question.id == question_id).first()
-    if not question:
-        raise HTTPException(status_code=404, detail=ERROR_QUESTION_NOT_FOUND)
-
-    # Save audio file
+def _save_audio(audio: UploadFile):
+    """Store an uploaded recording and return (file path, public URL)"""
     file_extension = os.path.splitext(audio.filename)[1] or settings.DEFAULT_AUDIO_EXTENSION
     filename = f"{uuid.uuid4()}{file_extension}"
     file_path = settings.UPLOAD_DIR / filename
 
-    with open(file_path, "wb") as buffer:
+    with stage_timer("upload_write", "disk"), open(file_path, "wb") as buffer:
         shutil.copyfileobj(audio.file, buffer)
 
-    audio_url = f"{settings.UPLOAD_BASE_URL}/{filename}"
+    return file_path, f"{settings.UPLOAD_BASE_URL}/{filename}"
 
-    # Transcribe audio using Google Cloud Speech-to-Text with Whisper fallback
-    from app.services.google_speech_service import transcribe_with_fallback
-    transcription = ""
-    transcription_method = TRANSCRIPTION_METHOD_UNKNOWN
+
+async def _transcribe(file_path: Path, part: int) -> Tuple[str, bool]:
+    """
+    Transcribe audio using Google Cloud Speech-to-Text with Whisper fallback
+
+    Returns the text and whether it is a real transcript; if transcription
+    failed, the text is the error message to store in its place. Raises 503
+    if Whisper is needed and its queue is full, and 504 if the deadline ran
+    out before a transcript was produced (nothing is saved then).
+    """
+    from app.services.google_speech_service import transcribe_with_fallback_async
     try:
-        transcription, transcription_method = transcribe_with_fallback(
+        transcription, transcription_method = await transcribe_with_fallback_async(
             file_path,
             language_code=settings.DEFAULT_LANGUAGE_CODE,
-            use_google=True  # Try Google first, fallback to Whisper
+            use_google=True,  # Try Google first, fallback to Whisper
+            part=part
         )
         # Add method info to transcription for display
         method_display = TRANSCRIPTION_DISPLAY_GOOGLE if transcription_method == TRANSCRIPTION_METHOD_GOOGLE else TRANSCRIPTION_DISPLAY_WHISPER
         logging.info(f"Transcription completed using: {method_display}")
+        return transcription, True
+    except QueueFullError as e:
+        os.remove(file_path)
+        raise queue_full_exception(e, ERROR_TRANSCRIPTION_BUSY.format(
+            position=e.position, retry_after=max(1, round(e.retry_after))
+        ))
+    except DeadlineExceeded as e:
+        logging.error(f"Transcription skipped: {str(e)}")
+        os.remove(file_path)
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=ERROR_TRANSCRIPTION_TIMEOUT)
     except Exception as e:
         # Log error but continue - we'll use placeholder
         logging.error(f"Transcription error: {str(e)}")
-        transcription = ERROR_TRANSCRIPTION_FAILED.format(error=str(e))
-        transcription_method = TRANSCRIPTION_METHOD_ERROR
-
-    # Get IELTS examiner feedback using Gemini AI
-    fluency_score = DEFAULT_FLUENCY_SCORE
-    vocabulary_score = DEFAULT_VOCABULARY_SCORE
-    grammar_score = DEFAULT_GRAMMAR_SCORE
-    pronunciation_score = DEFAULT_PRONUNCIATION_SCORE
-    overall_band = DEFAULT_OVERALL_BAND
-    feedback = ""
-    feedback_strengths = "[]"
-    feedback_improvements = "[]"
-    feedback_corrections = "[]"
+        return ERROR_TRANSCRIPTION_FAILED.format(error=str(e)), False
 
-    try:
-        # Get IELTS feedback from Gemini
-        ielts_feedback = await get_ielts_feedback(
-            transcription=transcription,
-            question=question.question_text,
-            part=part
-        )
 
-        if ielts_feedback:
-            fluency_score = ielts_feedback.fluency_score
-            vocabulary_score = ielts_feedback.vocabulary_score
-            grammar_score = ielts_feedback.grammar_score
-            pronunciation_score = ielts_feedback.pronunciation_score
-            overall_band = ielts_feedback.overall_band
-            feedback = format_feedback_text(ielts_feedback)
-            # Store structured feedback as JSON
-            feedback_strengths = json.dumps(ielts_feedback.strengths, ensure_ascii=False)
-            feedback_improvements = json.dumps(ielts_feedback.improvements, ensure_ascii=False)
-            feedback_corrections = json.dumps(ielts_feedback.sample_corrections, ensure_ascii=False)
-            logging.info(f"IELTS feedback generated - Overall band: {ielts_feedback.overall_band}")
-        else:
-            # Fallback if Gemini is unavailable
-            feedback = FEEDBACK_UNAVAILABLE
-            logging.warning("Gemini feedback unavailable, using fallback")
+def _feedback_columns(ielts_feedback: Optional[IELTSFeedback]) -> dict:
+    """Practice session score and feedback columns for a feedback result (or its absence)"""
+    if not ielts_feedback:
+        # Fallback if Gemini is unavailable
+        logging.warning("Gemini feedback unavailable, using fallback")
+        FEEDBACK_FALLBACKS.inc(reason="unavailable")
+        return _default_feedback_columns(FEEDBACK_UNAVAILABLE)
 
-    except Exception as e:
-        logging.error(f"Error getting IELTS feedback: {str(e)}")
-        feedback = FEEDBACK_ERROR_TEMPLATE.format(error=str(e))
+    logging.info(f"IELTS feedback generated - Overall band: {ielts_feedback.overall_band}")
+    return {
+        "fluency_score": ielts_feedback.fluency_score,
+        "vocabulary_score": ielts_feedback.vocabulary_score,
+        "grammar_score": ielts_feedback.grammar_score,
+        "pronunciation_score": ielts_feedback.pronunciation_score,
+        "overall_band": ielts_feedback.overall_band,
+        "feedback": format_feedback_text(ielts_feedback),
+        # Store structured feedback as JSON
+        "feedback_strengths": json.dumps(ielts_feedback.strengths, ensure_ascii=False),
+        "feedback_improvements": json.dumps(ielts_feedback.improvements, ensure_ascii=False),
+        "feedback_corrections": json.dumps(ielts_feedback.sample_corrections, ensure_ascii=False),
+    }
+
+
+def _no_transcript_columns() -> dict:
+    """Feedback columns for a recording that could not be transcribed: nothing to score, so no bands"""
+    FEEDBACK_FALLBACKS.inc(reason="no_transcript")
+    return {
+        "fluency_score": None,
+        "vocabulary_score": None,
+        "grammar_score": None,
+        "pronunciation_score": None,
+        "overall_band": None,
+        "feedback": FEEDBACK_NO_TRANSCRIPT,
+        "feedback_strengths": "[]",
+        "feedback_improvements": "[]",
+        "feedback_corrections": "[]",
+    }
 
+
+def _default_feedback_columns(feedback: str) -> dict:
+    return {
+        "fluency_score": DEFAULT_FLUENCY_SCORE,
+        "vocabulary_score": DEFAULT_VOCABULARY_SCORE,
+        "grammar_score": DEFAULT_GRAMMAR_SCORE,
+        "pronunciation_score": DEFAULT_PRONUNCIATION_SCORE,
+        "overall_band": DEFAULT_OVERALL_BAND,
+        "feedback": feedback,
+        "feedback_strengths": "[]",
+        "feedback_improvements": "[]",
+        "feedback_corrections": "[]",
+    }
+
+
+async def _save_analyzed_session(
+    db: AsyncSession,
+    user_id: int,
+    question_id: int,
+    part: int,
+    audio_url: str,
+    transcription: str,
+    feedback_columns: dict
+) -> models.PracticeSession:
+    """Create the practice session for an analyzed recording and update progress"""
     # Create practice session with structured feedback
     db_session = models.PracticeSession(
-        user_id=current_user.id,
+        user_id=user_id,
         question_id=question_id,
         part=part,
         audio_url=audio_url,
         transcription=transcription,
-        fluency_score=fluency_score,
-        vocabulary_score=vocabulary_score,
-        grammar_score=grammar_score,
-        pronunciation_score=pronunciation_score,
-        overall_band=overall_band,
-        feedback=feedback,
-        feedback_strengths=feedback_strengths,
-        feedback_improvements=feedback_improvements,
-        feedback_corrections=feedback_corrections
+        **feedback_columns
     )
-    db.add(db_session)
-
-    # Update all progress metrics
-    update_all_progress(db, current_user.id, part)
+    with stage_timer("db_commit", "database"):
+        db.add(db_session)
 
-    db.commit()
-    db.refresh(db_session)
+        # Update all progress metrics
+        with span("update_all_progress"):
+            await db.run_sync(update_all_progress, user_id, part)
 
+        await db.commit()
+        await db.refresh(db_session)
     return db_session
 
 
+@router.post("/analyze", dependencies=[Depends(analyze_rate_limit)])
+async def analyze_audio(
+    audio: UploadFile = File(...),
+    question_id: int = Form(...),
+    part: int = Form(...),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    idempotent: IdempotentRequest = Depends(analyze_idempotency)
+):
+    """
+    Analyze audio recording and create practice session with scores
+
+    Transcription and feedback share one ANALYZE_DEADLINE_SECONDS budget:
+    stages that cannot fit in what is left are skipped, and feedback falls
+    back to a local estimate, so the response time stays bounded. If no
+    transcript is produced within the budget, 504 is returned and nothing
+    is saved; a recording that failed to transcribe is saved unscored.
+
+    With an Idempotency-Key header, a retry returns the session saved by
+    the first request instead of analyzing and saving the recording again.
+    """
+    # Verify question exists
+    question = await db.get(models.Question, question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail=ERROR_QUESTION_NOT_FOUND)
+
+    # End the read transaction so no pooled connection is held during transcription and feedback
+    await db.commit()
+
+    async def analyze():
+        with deadline_scope(settings.ANALYZE_DEADLINE_SECONDS):
+            file_path, audio_url = _save_audio(audio)
+            transcription, transcribed = await _transcribe(file_path, part)
+
+            # Get IELTS examiner feedback using Gemini AI
+            try:
+                if transcribed:
+                    ielts_feedback = await get_ielts_feedback(
+                        transcription=transcription,
+                        question=question.question_text,
+                        part=part
+                    )
+                    feedback_columns = _feedback_columns(ielts_feedback)
+                else:
+                    feedback_columns = _no_transcript_columns()
+            except Exception as e:
+                logging.error(f"Error getting IELTS feedback: {str(e)}")
+                FEEDBACK_FALLBACKS.inc(reason="error")
+                feedback_columns = _default_feedback_columns(FEEDBACK_ERROR_TEMPLATE.format(error=str(e)))
+
+        return await _save_analyzed_session(
+            db, current_user.id, question_id, part, audio_url, transcription, feedback_columns
+        )
+
+    return await idempotent.run(
+        analyze, question_id=question_id, part=part, filename=audio.filename, size=audio.size
+    )
+
+
+@router.post("/analyze/stream", dependencies=[Depends(analyze_rate_limit)])
+async def analyze_audio_stream(
+    audio: UploadFile = File(...),
+    question_id: int = Form(...),
+    part: int = Form(...),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Streaming variant of /analyze using Server-Sent Events
+
+    Events, in order:
+        transcription: {"text"} once the recording is transcribed
+        score: {"name", "value"} for each band score, as soon as it is generated
+        field: {"name", "value"} for feedback, strengths, improvements and sample_corrections
+        session: the saved practice session, identical to the /analyze response
+        error: {"detail"} if the session could not be saved
+
+    As with /analyze, 504 is returned before streaming starts if no
+    transcript is produced within the deadline.
+    """
+    question = await db.get(models.Question, question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail=ERROR_QUESTION_NOT_FOUND)
+    question_text = question.question_text
+    user_id = current_user.id
+    await db.commit()
+
+    # Same end-to-end budget as /analyze, carried into the response body below
+    deadline = Deadline(settings.ANALYZE_DEADLINE_SECONDS)
+
+    # Read the upload now; the request body is gone once streaming starts
+    file_path, audio_url = _save_audio(audio)
+    # Transcribe before streaming so a full Whisper queue can still be answered with 503
+    with deadline_scope(deadline):
+        transcription, transcribed = await _transcribe(file_path, part)
+
+    async def event_stream():
+        yield sse_event("transcription", {"text": transcription})
+
+        feedback_columns = None if transcribed else _no_transcript_columns()
+        try:
+            if transcribed:
+                with deadline_scope(deadline):
+                    async for event, data in stream_ielts_feedback(
+                        transcription=transcription,
+                        question=question_text,
+                        part=part
+                    ):
+                        if event == "result":
+                            feedback_columns = _feedback_columns(data)
+                        else:
+                            yield sse_event(event, data)
+        except Exception as e:
+            logging.error(f"Error getting IELTS feedback: {str(e)}")
+            FEEDBACK_FALLBACKS.inc(reason="error")
+            feedback_columns = _default_feedback_columns(FEEDBACK_ERROR_TEMPLATE.format(error=str(e)))
+
+        # The request-scoped session may already be closed while streaming; use a dedicated one
+        try:
+            async with get_async_sessionmaker()() as session_db:
+                db_session = await _save_analyzed_session(
+                    session_db, user_id, question_id, part, audio_url, transcription, feedback_columns
+                )
+                payload = schemas.PracticeSessionResponse.model_validate(db_session).model_dump(mode="json")
+            yield sse_event("session", payload)
+        except Exception as e:
+            logging.error(f"Error saving streamed practice session: {str(e)}")
+            yield sse_event("error", {"detail": "Không thể lưu phiên luyện tập"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.get("/feedback/history", response_model=List[schemas.FeedbackHistoryItem])
-def get_feedback_history(
+async def get_feedback_history(
     limit: int = 20,
     offset: int = 0,
     part: Optional[int] = None,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy lịch sử phản hồi của người dùng
 
     Get user's feedback history with pagination and optional part filter
     """
-    query = db.query(models.PracticeSession).filter(
+    # Load only the listed columns and build the items without re-validating them
+    columns = [getattr(models.PracticeSession, name) for name in schemas.FeedbackHistoryItem.model_fields]
+    query = select(*columns).where(
         models.PracticeSession.user_id == current_user.id,
         models.PracticeSession.feedback.isnot(None),
         models.PracticeSession.audio_url.isnot(None)  # Only sessions with actual submissions
     )
 
     if part is not None:
-        query = query.filter(models.PracticeSession.part == part)
-
-    sessions = query.order_by(
-        desc(models.PracticeSession.created_at)
-    ).offset(offset).limit(limit).all()
+        query = query.where(models.PracticeSession.part == part)
 
-    return sessions
+    result = await db.execute(
+        query.order_by(desc(models.PracticeSession.created_at)).offset(offset).limit(limit)
+    )
+    items = [schemas.FeedbackHistoryItem.model_construct(**row) for row in result.mappings()]
+    return trusted_json(items, List[schemas.FeedbackHistoryItem])
 
 
 @router.get("/feedback/{session_id}", response_model=schemas.FeedbackDetailResponse)
-def get_feedback_detail(
+async def get_feedback_detail(
     session_id: int,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Xem chi tiết phản hồi của một phiên luyện tập
 
     Get detailed feedback for a specific practice session
     """
-    session = db.query(models.PracticeSession).filter(
-        models.PracticeSession.id == session_id,
-        models.PracticeSession.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(models.PracticeSession).where(
+            models.PracticeSession.id == session_id,
+            models.PracticeSession.user_id == current_user.id
+        )
+    )
+    session = result.scalars().first()
 
     if not session:
         raise HTTPException(
@@ -255,15 +437,11 @@ def get_feedback_detail(
     # Get question text if available
     question_text = None
     if session.question_id:
-        question = db.query(models.Question).filter(
-            models.Question.id == session.question_id
-        ).first()
+        question = await db.get(models.Question, session.question_id)
         if question:
             question_text = question.question_text
     elif session.user_question_id:
-        user_question = db.query(models.UserQuestion).filter(
-            models.UserQuestion.id == session.user_question_id
-        ).first()
+        user_question = await db.get(models.UserQuestion, session.user_question_id)
         if user_question:
             question_text = user_question.question_text
 
@@ -311,9 +489,9 @@ def get_feedback_detail(
 
 
 @router.get("/feedback/stats/summary")
-def get_feedback_stats(
+async def get_feedback_stats(
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Thống kê tổng quan về các phiên luyện tập
@@ -321,10 +499,13 @@ def get_feedback_stats(
     Get summary statistics of user's practice sessions
     """
     # Get all sessions with feedback
-    sessions = db.query(models.PracticeSession).filter(
-        models.PracticeSession.user_id == current_user.id,
-        models.PracticeSession.overall_band.isnot(None)
-    ).all()
+    result = await db.execute(
+        select(models.PracticeSession).where(
+            models.PracticeSession.user_id == current_user.id,
+            models.PracticeSession.overall_band.isnot(None)
+        )
+    )
+    sessions = result.scalars().all()
 
     if not sessions:
         return {
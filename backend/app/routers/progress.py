@@ -1,119 +1,201 @@
 from typing import List
 from datetime import date, timedelta, datetime
 from calendar import monthrange, month_name
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from app.database import get_db
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.core.progress_cache import cached_progress
+from app.core.responses import dump_json, etag_response
 from app import models, schemas, auth
 
 router = APIRouter()
 
 
-@router.get("/daily", response_model=schemas.DailyProgressResponse)
-def get_daily_progress(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
+async def _load_daily_progress(db: AsyncSession, user_id: int) -> models.DailyProgress:
+    """Today's DailyProgress row, added to the session (not committed) if missing"""
     today = date.today()
-    daily_progress = db.query(models.DailyProgress).filter(
-        models.DailyProgress.user_id == current_user.id,
-        models.DailyProgress.date == today
-    ).first()
+    result = await db.execute(
+        select(models.DailyProgress).where(
+            models.DailyProgress.user_id == user_id,
+            models.DailyProgress.date == today
+        )
+    )
+    daily_progress = result.scalars().first()
     
     if not daily_progress:
         daily_progress = models.DailyProgress(
-            user_id=current_user.id,
+            user_id=user_id,
             date=today,
             practice_count=0,
             target_count=10
         )
         db.add(daily_progress)
-        db.commit()
-        db.refresh(daily_progress)
     
     return daily_progress
 
 
-@router.get("/streak", response_model=schemas.StreakResponse)
-def get_streak(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
-    streak = db.query(models.Streak).filter(
-        models.Streak.user_id == current_user.id
-    ).first()
+async def _load_streak(db: AsyncSession, user_id: int) -> models.Streak:
+    """The user's Streak row, added to the session (not committed) if missing"""
+    result = await db.execute(
+        select(models.Streak).where(models.Streak.user_id == user_id)
+    )
+    streak = result.scalars().first()
     
     if not streak:
-        streak = models.Streak(user_id=current_user.id)
+        streak = models.Streak(
+            user_id=user_id,
+            current_streak=0,
+            longest_streak=0,
+            frozen_streak=0
+        )
         db.add(streak)
-        db.commit()
-        db.refresh(streak)
     
     return streak
 
 
-@router.get("/activity-calendar", response_model=List[schemas.ActivityCalendarResponse])
-def get_activity_calendar(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
+async def _load_activity_calendar(db: AsyncSession, user_id: int) -> List[models.ActivityCalendar]:
     # Get last 6 months of activity
     six_months_ago = date.today() - timedelta(days=180)
-    activities = db.query(models.ActivityCalendar).filter(
-        models.ActivityCalendar.user_id == current_user.id,
-        models.ActivityCalendar.date >= six_months_ago
-    ).order_by(models.ActivityCalendar.date).all()
-    
-    return activities
+    result = await db.execute(
+        select(models.ActivityCalendar).where(
+            models.ActivityCalendar.user_id == user_id,
+            models.ActivityCalendar.date >= six_months_ago
+        ).order_by(models.ActivityCalendar.date)
+    )
+    return list(result.scalars().all())
 
 
-@router.get("/part-progress", response_model=List[schemas.PartProgressResponse])
-def get_part_progress(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
-    part_progresses = db.query(models.PartProgress).filter(
-        models.PartProgress.user_id == current_user.id
-    ).all()
+async def _load_part_progress(db: AsyncSession, user_id: int) -> List[models.PartProgress]:
+    """PartProgress rows for parts 1-3, added to the session (not committed) if missing"""
+    part_progresses = list((await db.execute(
+        select(models.PartProgress).where(
+            models.PartProgress.user_id == user_id
+        ).order_by(models.PartProgress.part)
+    )).scalars().all())
     
     # If no progress exists, initialize with totals
     if not part_progresses:
+        question_counts = dict((await db.execute(
+            select(models.Question.part, func.count(models.Question.id)).group_by(models.Question.part)
+        )).all())
         for part in [1, 2, 3]:
-            total_count = db.query(func.count(models.Question.id)).filter(
-                models.Question.part == part
-            ).scalar() or 0
             part_progress = models.PartProgress(
-                user_id=current_user.id,
+                user_id=user_id,
                 part=part,
                 completed_count=0,
-                total_count=total_count
+                total_count=question_counts.get(part, 0)
             )
             db.add(part_progress)
-        db.commit()
-        part_progresses = db.query(models.PartProgress).filter(
-            models.PartProgress.user_id == current_user.id
-        ).all()
+            part_progresses.append(part_progress)
     
     return part_progresses
 
 
-@router.get("/streak-analytics", response_model=schemas.StreakAnalyticsResponse)
-def get_streak_analytics(
-    year: int = Query(None),
-    month: int = Query(None),
+async def _commit_if_new(db: AsyncSession):
+    """Persist rows the loaders created on a user's first visit"""
+    if db.new:
+        await db.commit()
+
+
+@router.get("/daily", response_model=schemas.DailyProgressResponse)
+async def get_daily_progress(
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    daily_progress = await _load_daily_progress(db, current_user.id)
+    await _commit_if_new(db)
+    return daily_progress
+
+
+@router.get("/streak", response_model=schemas.StreakResponse)
+async def get_streak(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    streak = await _load_streak(db, current_user.id)
+    await _commit_if_new(db)
+    return streak
+
+
+@router.get("/activity-calendar", response_model=List[schemas.ActivityCalendarResponse])
+async def get_activity_calendar(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def compute() -> bytes:
+        activity_calendar = await _load_activity_calendar(db, current_user.id)
+        return dump_json(
+            [schemas.ActivityCalendarResponse.model_validate(a) for a in activity_calendar],
+            List[schemas.ActivityCalendarResponse]
+        )
+
+    body = await cached_progress(current_user.id, "activity-calendar", None, compute)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/part-progress", response_model=List[schemas.PartProgressResponse])
+async def get_part_progress(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def compute() -> bytes:
+        part_progresses = await _load_part_progress(db, current_user.id)
+        await _commit_if_new(db)
+        return dump_json(
+            [schemas.PartProgressResponse.model_validate(p) for p in part_progresses],
+            List[schemas.PartProgressResponse]
+        )
+
+    body = await cached_progress(current_user.id, "part-progress", None, compute)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/dashboard", response_model=schemas.DashboardResponse)
+async def get_dashboard(
+    request: Request,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Daily progress, streak, activity calendar and part progress in one response.
+    
+    One authentication and one session for what the home page used to fetch
+    in four requests; four indexed selects, plus one commit on a user's first
+    visit. Carries an ETag, so an unchanged dashboard revalidates with a 304.
+    Repeat loads are served from the progress cache with a single lookup.
+    """
+    async def compute() -> bytes:
+        daily_progress = await _load_daily_progress(db, current_user.id)
+        streak = await _load_streak(db, current_user.id)
+        activity_calendar = await _load_activity_calendar(db, current_user.id)
+        part_progresses = await _load_part_progress(db, current_user.id)
+        await _commit_if_new(db)
+        return dump_json(schemas.DashboardResponse(
+            daily=schemas.DailyProgressResponse.model_validate(daily_progress),
+            streak=schemas.StreakResponse.model_validate(streak),
+            activity_calendar=[schemas.ActivityCalendarResponse.model_validate(a) for a in activity_calendar],
+            part_progress=[schemas.PartProgressResponse.model_validate(p) for p in part_progresses]
+        ))
+
+    return etag_response(request, await cached_progress(current_user.id, "dashboard", None, compute))
+
+
+async def _build_streak_analytics(
+    db: AsyncSession,
+    user_id: int,
+    year: int,
+    month: int
+) -> schemas.StreakAnalyticsResponse:
     """Get comprehensive streak analytics including calendar, charts, and statistics."""
     today = date.today()
     target_year = year or today.year
     target_month = month or today.month
     
     # Get streak info
-    streak = db.query(models.Streak).filter(
-        models.Streak.user_id == current_user.id
-    ).first()
+    streak = (await db.execute(
+        select(models.Streak).where(models.Streak.user_id == user_id)
+    )).scalars().first()
     current_streak = streak.current_streak if streak else 0
     
     # Calculate calendar days for the month
@@ -121,11 +203,13 @@ def get_streak_analytics(
     last_day = date(target_year, target_month, monthrange(target_year, target_month)[1])
     
     # Get all activity for the month
-    month_activities = db.query(models.ActivityCalendar).filter(
-        models.ActivityCalendar.user_id == current_user.id,
-        models.ActivityCalendar.date >= first_day,
-        models.ActivityCalendar.date <= last_day
-    ).all()
+    month_activities = (await db.execute(
+        select(models.ActivityCalendar).where(
+            models.ActivityCalendar.user_id == user_id,
+            models.ActivityCalendar.date >= first_day,
+            models.ActivityCalendar.date <= last_day
+        )
+    )).scalars().all()
     activity_dict = {act.date: act.practice_count for act in month_activities}
     
     # Build calendar days
@@ -144,9 +228,11 @@ def get_streak_analytics(
     this_month_total = sum(act.practice_count for act in month_activities)
     
     # Get total completions (all time)
-    total_completions = db.query(func.sum(models.ActivityCalendar.practice_count)).filter(
-        models.ActivityCalendar.user_id == current_user.id
-    ).scalar() or 0
+    total_completions = (await db.execute(
+        select(func.sum(models.ActivityCalendar.practice_count)).where(
+            models.ActivityCalendar.user_id == user_id
+        )
+    )).scalar() or 0
     
     # Calculate off days (days with no activity in current streak period)
     off_days = 0
@@ -156,20 +242,24 @@ def get_streak_analytics(
         if days_since > 0:
             for i in range(1, days_since + 1):
                 check_date = streak.last_activity_date + timedelta(days=i)
-                has_activity = db.query(models.ActivityCalendar).filter(
-                    models.ActivityCalendar.user_id == current_user.id,
-                    models.ActivityCalendar.date == check_date,
-                    models.ActivityCalendar.practice_count > 0
-                ).first()
+                has_activity = (await db.execute(
+                    select(models.ActivityCalendar).where(
+                        models.ActivityCalendar.user_id == user_id,
+                        models.ActivityCalendar.date == check_date,
+                        models.ActivityCalendar.practice_count > 0
+                    )
+                )).scalars().first()
                 if not has_activity:
                     off_days += 1
     
     # Yearly heatmap (last 365 days)
     one_year_ago = today - timedelta(days=365)
-    yearly_activities = db.query(models.ActivityCalendar).filter(
-        models.ActivityCalendar.user_id == current_user.id,
-        models.ActivityCalendar.date >= one_year_ago
-    ).all()
+    yearly_activities = (await db.execute(
+        select(models.ActivityCalendar).where(
+            models.ActivityCalendar.user_id == user_id,
+            models.ActivityCalendar.date >= one_year_ago
+        )
+    )).scalars().all()
     yearly_heatmap = [
         schemas.YearlyHeatmapResponse(date=act.date, practice_count=act.practice_count)
         for act in yearly_activities
@@ -177,11 +267,13 @@ def get_streak_analytics(
     
     # Streak history (last 6 months)
     six_months_ago = today - timedelta(days=180)
-    recent_activities = db.query(models.ActivityCalendar).filter(
-        models.ActivityCalendar.user_id == current_user.id,
-        models.ActivityCalendar.date >= six_months_ago,
-        models.ActivityCalendar.practice_count > 0
-    ).order_by(models.ActivityCalendar.date).all()
+    recent_activities = (await db.execute(
+        select(models.ActivityCalendar).where(
+            models.ActivityCalendar.user_id == user_id,
+            models.ActivityCalendar.date >= six_months_ago,
+            models.ActivityCalendar.practice_count > 0
+        ).order_by(models.ActivityCalendar.date)
+    )).scalars().all()
     
     streak_history = []
     if recent_activities:
@@ -210,10 +302,12 @@ def get_streak_analytics(
         ))
     
     # Weekly pattern (aggregate by day of week)
-    all_activities = db.query(models.ActivityCalendar).filter(
-        models.ActivityCalendar.user_id == current_user.id,
-        models.ActivityCalendar.practice_count > 0
-    ).all()
+    all_activities = (await db.execute(
+        select(models.ActivityCalendar).where(
+            models.ActivityCalendar.user_id == user_id,
+            models.ActivityCalendar.practice_count > 0
+        )
+    )).scalars().all()
     
     weekly_totals = {i: 0 for i in range(7)}  # 0=Monday, 6=Sunday
     day_names = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
@@ -240,11 +334,13 @@ def get_streak_analytics(
         month_start = date(check_date.year, check_date.month, 1)
         month_end = date(check_date.year, check_date.month, monthrange(check_date.year, check_date.month)[1])
         
-        month_total = db.query(func.sum(models.ActivityCalendar.practice_count)).filter(
-            models.ActivityCalendar.user_id == current_user.id,
-            models.ActivityCalendar.date >= month_start,
-            models.ActivityCalendar.date <= month_end
-        ).scalar() or 0
+        month_total = (await db.execute(
+            select(func.sum(models.ActivityCalendar.practice_count)).where(
+                models.ActivityCalendar.user_id == user_id,
+                models.ActivityCalendar.date >= month_start,
+                models.ActivityCalendar.date <= month_end
+            )
+        )).scalar() or 0
         
         monthly_progress.append(schemas.MonthlyProgressItem(
             month=month_name[check_date.month],
@@ -275,3 +371,18 @@ def get_streak_analytics(
         time_of_day=time_of_day
     )
 
+
+@router.get("/streak-analytics", response_model=schemas.StreakAnalyticsResponse)
+async def get_streak_analytics(
+    year: int = Query(None),
+    month: int = Query(None),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get comprehensive streak analytics including calendar, charts, and statistics."""
+    async def compute() -> bytes:
+        # Built from typed items already; skip re-validating the whole tree on the way out
+        return dump_json(await _build_streak_analytics(db, current_user.id, year, month))
+
+    body = await cached_progress(current_user.id, "streak-analytics", {"year": year, "month": month}, compute)
+    return Response(content=body, media_type="application/json")
@@ -1,25 +1,54 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas, auth
 from app.services import tts_service
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    page_size,
+    parse_fields,
+    paginate,
+    project,
+    rows_to_items,
+    set_pagination_headers
+)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.QuestionResponse])
+QUESTION_FIELDS = list(schemas.QuestionListItem.model_fields)
+USER_QUESTION_FIELDS = list(schemas.UserQuestionListItem.model_fields)
+
+
+@router.get(
+    "/",
+    response_model=List[schemas.QuestionListItem],
+    response_model_exclude_unset=True
+)
 def get_questions(
+    response: Response,
     part: Optional[int] = Query(None, ge=1, le=3),
     topic: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit limit, offset and after_id for the full list"),
+    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: return questions with id greater than this"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields, e.g. id,topic"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Question)
+    limit = page_size(limit, offset, after_id)
+    selected = parse_fields(fields, QUESTION_FIELDS)
+    query = project(db.query(models.Question), models.Question, selected)
     if part:
         query = query.filter(models.Question.part == part)
     if topic:
         query = query.filter(models.Question.topic.ilike(f"%{topic}%"))
-    return query.all()
+    items = rows_to_items(
+        paginate(query, models.Question, limit, offset, after_id).all(),
+        selected
+    )
+    set_pagination_headers(response, items, limit)
+    return items
 
 
 @router.get("/topics", response_model=List[str])
@@ -30,46 +59,33 @@ def get_topics(part: Optional[int] = Query(None, ge=1, le=3), db: Session = Depe
     return [topic[0] for topic in query.all()]
 
 
-@router.get("/{question_id}", response_model=schemas.QuestionResponse)
-def get_question(
-    question_id: int,
-    db: Session = Depends(get_db)
-):
-    question = db.query(models.Question).filter(models.Question.id == question_id).first()
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found")
-    return question
-
-
-@router.get("/{question_id}/audio")
-def get_question_audio(
-    question_id: int,
-    db: Session = Depends(get_db)
-):
-    """
-    Generate or retrieve TTS audio for a question
-    """
-    question = db.query(models.Question).filter(models.Question.id == question_id).first()
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    try:
-        audio_url = tts_service.get_tts_audio_url(question.question_text, question_id)
-        return {"audio_url": audio_url}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate audio: {str(e)}")
-
-
-@router.get("/user-questions", response_model=List[schemas.UserQuestionResponse])
+@router.get(
+    "/user-questions",
+    response_model=List[schemas.UserQuestionListItem],
+    response_model_exclude_unset=True
+)
 def get_user_questions(
+    response: Response,
     part: Optional[int] = Query(None, ge=1, le=3),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit limit, offset and after_id for the full list"),
+    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: return questions with id greater than this"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields, e.g. id,topic"),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.UserQuestion).filter(models.UserQuestion.user_id == current_user.id)
+    limit = page_size(limit, offset, after_id)
+    selected = parse_fields(fields, USER_QUESTION_FIELDS)
+    query = project(db.query(models.UserQuestion), models.UserQuestion, selected)
+    query = query.filter(models.UserQuestion.user_id == current_user.id)
     if part:
         query = query.filter(models.UserQuestion.part == part)
-    return query.all()
+    items = rows_to_items(
+        paginate(query, models.UserQuestion, limit, offset, after_id).all(),
+        selected
+    )
+    set_pagination_headers(response, items, limit)
+    return items
 
 
 @router.post("/user-questions", response_model=schemas.UserQuestionResponse)
@@ -104,3 +120,32 @@ def delete_user_question(
     db.commit()
     return {"message": "Question deleted"}
 
+
+@router.get("/{question_id}", response_model=schemas.QuestionResponse)
+def get_question(
+    question_id: int,
+    db: Session = Depends(get_db)
+):
+    question = db.query(models.Question).filter(models.Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return question
+
+
+@router.get("/{question_id}/audio")
+def get_question_audio(
+    question_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Generate or retrieve TTS audio for a question
+    """
+    question = db.query(models.Question).filter(models.Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    
+    try:
+        audio_url = tts_service.get_tts_audio_url(question.question_text, question_id)
+        return {"audio_url": audio_url}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate audio: {str(e)}")
@@ -2,9 +2,8 @@
 Transcription router - handles speech-to-text transcription
 Supports Google Cloud Speech-to-Text and Whisper fallback
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from fastapi.responses import JSONResponse
-from pathlib import Path
 import os
 import uuid
 import shutil
@@ -16,16 +15,20 @@ from app.services.google_speech_service import (
     transcribe_audio_google, 
     get_speech_client, 
     GOOGLE_SPEECH_AVAILABLE,
-    transcribe_with_fallback
+    transcribe_with_fallback_async
 )
 from app import models, auth
+from app.core.config import settings
+from app.core.rate_limit import RateLimit
+from app.core.idempotency import Idempotency, IdempotentRequest
+from app.core.job_queue import QueueFullError, queue_full_exception
+from app.core.constants import ERROR_TRANSCRIPTION_BUSY
 from fastapi.security import OAuth2PasswordBearer
 
 router = APIRouter()
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("uploads/audio")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+transcribe_rate_limit = RateLimit("transcribe", settings.RATE_LIMIT_TRANSCRIBE_USER, settings.RATE_LIMIT_TRANSCRIBE_GLOBAL)
+transcribe_idempotency = Idempotency("transcribe")
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +36,14 @@ logger = logging.getLogger(__name__)
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 
 
-@router.post("/transcribe")
+@router.post("/transcribe", dependencies=[Depends(transcribe_rate_limit)])
 async def transcribe_audio(
     audio: UploadFile = File(...),
     use_google: bool = True,
     language_code: str = "en-US",
-    token: Optional[str] = Depends(oauth2_scheme_optional)
+    part: Optional[int] = Form(None),
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    idempotent: IdempotentRequest = Depends(transcribe_idempotency)
 ):
     """
     Transcribe audio file using Google Cloud Speech-to-Text (primary) or Whisper (fallback)
@@ -47,54 +52,71 @@ async def transcribe_audio(
         audio: Audio file to transcribe
         use_google: Whether to try Google Cloud Speech-to-Text first (default: True)
         language_code: BCP-47 language code (default: "en-US")
+        part: Optional IELTS part, used to prioritize short answers in the Whisper queue
         token: Optional authentication token
+        idempotent: Idempotency-Key handling; a retry with the same key gets the first transcription
         
     Returns:
         JSON response with transcription and method used
     """
-    # Save audio file temporarily
-    file_extension = os.path.splitext(audio.filename)[1] or ".webm"
-    filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = UPLOAD_DIR / filename
+    async def transcribe():
+        # Save audio file temporarily
+        file_extension = os.path.splitext(audio.filename)[1] or ".webm"
+        filename = f"{uuid.uuid4()}{file_extension}"
+        file_path = settings.UPLOAD_DIR / filename
     
-    try:
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
+        try:
+            # Save uploaded file
+            with open(file_path, "wb") as buffer:
+                shutil.copyfileobj(audio.file, buffer)
         
-        transcription, method = transcribe_with_fallback(
-            file_path,
-            language_code=language_code,
-            use_google=use_google
-        )
+            transcription, method = await transcribe_with_fallback_async(
+                file_path,
+                language_code=language_code,
+                use_google=use_google,
+                part=part
+            )
         
-        response_data = {
-            "transcription": transcription,
-            "method": method,
-            "language_code": language_code,
-            "method_display": "Google Cloud Speech-to-Text" if method == "google" else "Whisper (Local)"
-        }
+            response_data = {
+                "transcription": transcription,
+                "method": method,
+                "language_code": language_code,
+                "method_display": "Google Cloud Speech-to-Text" if method == "google" else "Whisper (Local)"
+            }
         
-        # Log the method used for easy debugging
-        logger.info(f"📝 Transcription completed using: {response_data['method_display']}")
+            # Log the method used for easy debugging
+            logger.info(f"📝 Transcription completed using: {response_data['method_display']}")
         
-        return JSONResponse(response_data)
+            return JSONResponse(response_data)
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Transcription error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Transcription failed: {str(e)}"
-        )
-    finally:
-        # Clean up temporary file
-        try:
-            if file_path.exists():
-                os.remove(file_path)
+        except HTTPException:
+            raise
+        except QueueFullError as e:
+            raise queue_full_exception(e, ERROR_TRANSCRIPTION_BUSY.format(
+                position=e.position, retry_after=max(1, round(e.retry_after))
+            ))
         except Exception as e:
-            logger.warning(f"Failed to clean up temporary file: {e}")
+            logger.error(f"Transcription error: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Transcription failed: {str(e)}"
+            )
+        finally:
+            # Clean up temporary file
+            try:
+                if file_path.exists():
+                    os.remove(file_path)
+            except Exception as e:
+                logger.warning(f"Failed to clean up temporary file: {e}")
+
+    return await idempotent.run(
+        transcribe,
+        use_google=use_google,
+        language_code=language_code,
+        part=part,
+        filename=audio.filename,
+        size=audio.size
+    )
 
 
 @router.get("/transcribe/status")
@@ -124,6 +146,7 @@ async def get_transcription_status():
         },
         "whisper": {
             "available": True,  # Whisper is always available (local)
-            "error": None
+            "error": None,
+            "queue": whisper_service.whisper_queue.stats()
         }
     })
@@ -42,6 +42,18 @@ class QuestionResponse(QuestionBase):
         from_attributes = True
 
 
+class QuestionListItem(BaseModel):
+    """Question list entry; only the fields requested via ``fields=`` are returned"""
+    id: int
+    part: Optional[int] = None
+    topic: Optional[str] = None
+    question_text: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class UserQuestionCreate(BaseModel):
     part: int
     topic: Optional[str] = None
@@ -57,6 +69,19 @@ class UserQuestionResponse(UserQuestionCreate):
         from_attributes = True
 
 
+class UserQuestionListItem(BaseModel):
+    """User question list entry; only the fields requested via ``fields=`` are returned"""
+    id: int
+    user_id: Optional[int] = None
+    part: Optional[int] = None
+    topic: Optional[str] = None
+    question_text: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Practice session schemas
 class PracticeSessionCreate(BaseModel):
     question_id: Optional[int] = None
@@ -185,6 +210,13 @@ class PartProgressResponse(BaseModel):
         from_attributes = True
 
 
+class DashboardResponse(BaseModel):
+    daily: DailyProgressResponse
+    streak: StreakResponse
+    activity_calendar: List[ActivityCalendarResponse]
+    part_progress: List[PartProgressResponse]
+
+
 # Streak Analytics schemas
 class CalendarDayResponse(BaseModel):
     date: date
@@ -2,25 +2,41 @@
 Gemini-based IELTS Speaking Feedback Service
 Provides professional IELTS examiner-style evaluation and feedback
 """
+import asyncio
 import os
 import json
 import logging
 import re
-from typing import Optional
+import time
+from datetime import timedelta
+from typing import AsyncIterator, List, Optional, Tuple
 from dataclasses import dataclass
 from decimal import Decimal
 
+from pydantic import BaseModel, ValidationError, field_validator
+
+from app.core.config import settings
+from app.core.deadline import Deadline, current_deadline, stage_timeout
+from app.core.metrics import registry
+from app.core.stage_metrics import stage_timer, FEEDBACK_FALLBACKS
+from app.services.prompt_templates import PromptTemplate, register_template, get_template
+from app.utils.json_stream import IncrementalJSONObjectParser
+from app.utils.optional_imports import module_available
+
 logger = logging.getLogger(__name__)
 
-# Try to import google generative AI
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+# The SDK is imported on first use (see load_gemini_sdk) to keep startup fast
+GEMINI_AVAILABLE = module_available("google.generativeai")
+if not GEMINI_AVAILABLE:
     logger.warning("google-generativeai not installed. Gemini feedback will be unavailable.")
 
 
+def load_gemini_sdk():
+    """Import and return the google.generativeai module (cached by Python after the first call)"""
+    import google.generativeai as genai
+    return genai
+
+
 @dataclass
 class IELTSFeedback:
     """IELTS Speaking feedback result"""
@@ -33,18 +49,65 @@ class IELTSFeedback:
     strengths: list
     improvements: list
     sample_corrections: list
+    usage: Optional[dict] = None  # token accounting for the call that produced it
+
+
+# Response schema sent to Gemini and used to validate its output.
+# Gemini's schema subset has no defaults or numeric bounds, so ranges are
+# enforced by validators instead of Field constraints.
+class SampleCorrection(BaseModel):
+    original: str
+    corrected: str
+    explanation: str
+
+
+class IELTSFeedbackSchema(BaseModel):
+    fluency_score: float
+    vocabulary_score: float
+    grammar_score: float
+    pronunciation_score: float
+    overall_band: float
+    feedback: str
+    strengths: List[str]
+    improvements: List[str]
+    sample_corrections: List[SampleCorrection]
+
+    @field_validator(
+        "fluency_score", "vocabulary_score", "grammar_score", "pronunciation_score", "overall_band"
+    )
+    @classmethod
+    def check_band(cls, value: float) -> float:
+        if not 0 <= value <= 9:
+            raise ValueError("band score must be between 0 and 9")
+        # IELTS bands are reported in steps of 0.5
+        return round(value * 2) / 2
+
+
+SCORE_FIELDS = ("fluency_score", "vocabulary_score", "grammar_score", "pronunciation_score", "overall_band")
+
+
+class FeedbackParseError(ValueError):
+    """Gemini output could not be parsed into IELTSFeedbackSchema"""
 
+    def __init__(self, message: str, data: Optional[dict] = None):
+        super().__init__(message)
+        self.data = data
 
-# IELTS Examiner Prompt Template - Vietnamese Response
-IELTS_EXAMINER_PROMPT = """Bạn là một giám khảo IELTS Speaking được chứng nhận với hơn 15 năm kinh nghiệm. Phân tích câu trả lời speaking sau và cung cấp phản hồi chi tiết, mang tính xây dựng BẰNG TIẾNG VIỆT.
 
-## Bối cảnh bài thi IELTS Speaking
+# IELTS Examiner Prompt - Vietnamese Response
+# Split so the static rubric can be sent once as a system instruction (and
+# cached) while only the per-answer context changes on each call.
+IELTS_EXAMINER_INTRO = """Bạn là một giám khảo IELTS Speaking được chứng nhận với hơn 15 năm kinh nghiệm. Phân tích câu trả lời speaking sau và cung cấp phản hồi chi tiết, mang tính xây dựng BẰNG TIẾNG VIỆT."""
+
+# Per-answer variables
+IELTS_ANSWER_TEMPLATE = """## Bối cảnh bài thi IELTS Speaking
 - **Phần thi**: {part}
 - **Câu hỏi/Chủ đề**: {question}
 - **Câu trả lời của thí sinh**: 
-"{transcription}"
+"{transcription}\""""
 
-## Nhiệm vụ của bạn
+# Static examiner rubric and output format
+IELTS_EXAMINER_RUBRIC = """## Nhiệm vụ của bạn
 Đánh giá câu trả lời này theo tiêu chí Band Descriptors chính thức của IELTS Speaking. Cung cấp điểm số và phản hồi chi tiết BẰNG TIẾNG VIỆT.
 
 ## Tham khảo tiêu chí chấm điểm IELTS:
@@ -73,7 +136,7 @@ IELTS_EXAMINER_PROMPT = """Bạn là một giám khảo IELTS Speaking được
 Cung cấp đánh giá của bạn theo định dạng JSON sau (CHỈ JSON, không có text nào khác):
 
 ```json
-{{
+{
     "fluency_score": <điểm từ 1.0 đến 9.0 theo bước 0.5>,
     "vocabulary_score": <điểm từ 1.0 đến 9.0 theo bước 0.5>,
     "grammar_score": <điểm từ 1.0 đến 9.0 theo bước 0.5>,
@@ -91,13 +154,13 @@ Cung cấp đánh giá của bạn theo định dạng JSON sau (CHỈ JSON, kh
         "<điểm cần cải thiện 3 với lời khuyên cụ thể - viết bằng tiếng Việt>"
     ],
     "sample_corrections": [
-        {{
+        {
             "original": "<cụm từ sai hoặc có thể cải thiện từ câu trả lời>",
             "corrected": "<phiên bản đã sửa>",
             "explanation": "<giải thích ngắn gọn bằng tiếng Việt>"
-        }}
+        }
     ]
-}}
+}
 ```
 
 ## Hướng dẫn quan trọng:
@@ -110,9 +173,111 @@ Cung cấp đánh giá của bạn theo định dạng JSON sau (CHỈ JSON, kh
 7. TẤT CẢ phản hồi, nhận xét, điểm mạnh, điểm cần cải thiện và giải thích PHẢI VIẾT BẰNG TIẾNG VIỆT
 """
 
+IELTS_EXAMINER_SYSTEM_INSTRUCTION = f"{IELTS_EXAMINER_INTRO}\n\n{IELTS_EXAMINER_RUBRIC}"
+
+# Original single-prompt template (rubric resent on every call)
+IELTS_EXAMINER_PROMPT = (
+    f"{IELTS_EXAMINER_INTRO}\n\n{IELTS_ANSWER_TEMPLATE}\n\n"
+    + IELTS_EXAMINER_RUBRIC.replace("{", "{{").replace("}", "}}")
+)
+
+
+EXAMINER_TEMPLATE = "ielts_examiner"
+
+register_template(PromptTemplate(
+    name=EXAMINER_TEMPLATE,
+    version="1",
+    user_template=IELTS_EXAMINER_PROMPT,
+    description="Single prompt; the rubric is resent as input tokens on every call"
+))
+register_template(PromptTemplate(
+    name=EXAMINER_TEMPLATE,
+    version="2",
+    user_template=IELTS_ANSWER_TEMPLATE,
+    system_instruction=IELTS_EXAMINER_SYSTEM_INSTRUCTION,
+    description="Rubric sent as a system instruction (cacheable); only the answer is sent per call"
+), default=True)
+
+GEMINI_TOKENS = registry.counter(
+    "gemini_tokens_total",
+    "Gemini tokens by prompt template and kind (prompt, cached, output)",
+    labelnames=("template", "kind")
+)
+GEMINI_REQUEST_SECONDS = registry.histogram(
+    "gemini_request_seconds",
+    "Gemini generate_content latency by prompt template",
+    labelnames=("template",)
+)
+FEEDBACK_PARSE_RESULTS = registry.counter(
+    "gemini_feedback_parse_total",
+    "Feedback parse outcomes: ok, repaired (after a repair call), salvaged (partial), failed",
+    labelnames=("outcome",)
+)
+FEEDBACK_PARSE_FAILURES = registry.counter(
+    "gemini_feedback_parse_failures_total",
+    "Gemini responses that failed schema validation, by attempt (initial or repair)",
+    labelnames=("attempt",)
+)
+
+FEEDBACK_REPAIR_TEMPLATE = "ielts_feedback_repair"
+
+register_template(PromptTemplate(
+    name=FEEDBACK_REPAIR_TEMPLATE,
+    version="1",
+    user_template="""Phản hồi JSON dưới đây không khớp với schema yêu cầu.
+
+Lỗi kiểm tra:
+{errors}
+
+Phản hồi gốc:
+{response}
+
+Trả về CHỈ JSON đã sửa, giữ nguyên nội dung đánh giá, điền các trường còn thiếu.""",
+    description="Ask the model to fix a response that failed schema validation"
+))
+
+_gemini_configured_key = None
+# Template key -> (model, refresh deadline on the monotonic clock)
+_models: dict = {}
+
+
+def _create_model(template: PromptTemplate):
+    """
+    Build a GenerativeModel for a template
+
+    With GEMINI_CONTEXT_CACHE enabled the system instruction is stored as
+    cached content and referenced by name, so its tokens are billed at the
+    cached rate. Otherwise it is sent as a system instruction, which keeps it
+    a stable prefix that Gemini can cache implicitly.
+    """
+    genai = load_gemini_sdk()
+    if template.system_instruction and settings.GEMINI_CONTEXT_CACHE:
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        try:
+            from google.generativeai import caching
+            cached_content = caching.CachedContent.create(
+                model=f"models/{settings.GEMINI_MODEL}",
+                display_name=f"{template.key}-{template.fingerprint}",
+                system_instruction=template.system_instruction,
+                ttl=timedelta(seconds=ttl)
+            )
+            logger.info(f"Created Gemini cached content for {template.key}")
+            # Rebuild a minute before the cache expires on the server
+            return genai.GenerativeModel.from_cached_content(cached_content), time.monotonic() + max(ttl - 60, 0)
+        except Exception as e:
+            logger.warning(f"Gemini context caching unavailable for {template.key}, using system instruction: {e}")
+
+    model = genai.GenerativeModel(
+        settings.GEMINI_MODEL,
+        system_instruction=template.system_instruction
+    )
+    return model, float("inf")
+
+
+def get_gemini_client(template: Optional[PromptTemplate] = None):
+    """Initialize and return Gemini client (a model bound to the prompt template's system instruction)"""
+    global _gemini_configured_key
 
-def get_gemini_client():
-    """Initialize and return Gemini client"""
     if not GEMINI_AVAILABLE:
         return None
     
@@ -121,8 +286,44 @@ def get_gemini_client():
         logger.warning("GEMINI_API_KEY not set in environment")
         return None
     
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-2.5-flash')
+    if api_key != _gemini_configured_key:
+        load_gemini_sdk().configure(api_key=api_key)
+        _gemini_configured_key = api_key
+        _models.clear()
+
+    template = template or get_examiner_template()
+    cached = _models.get(template.key)
+    if cached is None or cached[1] <= time.monotonic():
+        cached = _create_model(template)
+        _models[template.key] = cached
+    return cached[0]
+
+
+def get_examiner_template() -> PromptTemplate:
+    """The examiner prompt template selected by GEMINI_PROMPT_VERSION"""
+    return get_template(EXAMINER_TEMPLATE, settings.GEMINI_PROMPT_VERSION or None)
+
+
+def record_usage(template: PromptTemplate, response, latency: float) -> dict:
+    """Record token counts and latency for a Gemini response"""
+    metadata = getattr(response, "usage_metadata", None)
+    usage = {
+        "template": template.key,
+        "prompt_tokens": getattr(metadata, "prompt_token_count", 0) or 0,
+        "cached_tokens": getattr(metadata, "cached_content_token_count", 0) or 0,
+        "output_tokens": getattr(metadata, "candidates_token_count", 0) or 0,
+        "total_tokens": getattr(metadata, "total_token_count", 0) or 0,
+        "latency_seconds": round(latency, 3),
+    }
+    GEMINI_TOKENS.inc(usage["prompt_tokens"], template=template.key, kind="prompt")
+    GEMINI_TOKENS.inc(usage["cached_tokens"], template=template.key, kind="cached")
+    GEMINI_TOKENS.inc(usage["output_tokens"], template=template.key, kind="output")
+    GEMINI_REQUEST_SECONDS.observe(latency, template=template.key)
+    logger.info(
+        f"Gemini usage ({template.key}): prompt={usage['prompt_tokens']} "
+        f"cached={usage['cached_tokens']} output={usage['output_tokens']} latency={latency:.2f}s"
+    )
+    return usage
 
 
 def parse_gemini_response(response_text: str) -> dict:
@@ -147,6 +348,172 @@ def parse_gemini_response(response_text: str) -> dict:
         raise ValueError(f"Could not parse feedback response: {e}")
 
 
+def parse_feedback_response(response_text: str) -> IELTSFeedbackSchema:
+    """Parse and validate a Gemini response against IELTSFeedbackSchema"""
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        # Structured output should be plain JSON; tolerate fenced output just in case
+        try:
+            data = parse_gemini_response(response_text)
+        except ValueError as e:
+            raise FeedbackParseError(str(e))
+
+    if not isinstance(data, dict):
+        raise FeedbackParseError("Feedback response is not a JSON object")
+    try:
+        return IELTSFeedbackSchema.model_validate(data)
+    except ValidationError as e:
+        raise FeedbackParseError(str(e), data=data)
+
+
+def salvage_feedback(data: Optional[dict]) -> Optional[IELTSFeedbackSchema]:
+    """
+    Keep a partially valid response: all scores must be valid, while
+    missing or malformed narrative fields are replaced with empty values
+    """
+    if not data or any(field not in data for field in SCORE_FIELDS):
+        return None
+
+    salvaged = {field: data[field] for field in SCORE_FIELDS}
+    salvaged["feedback"] = data.get("feedback") if isinstance(data.get("feedback"), str) else ""
+    for field in ("strengths", "improvements"):
+        values = data.get(field)
+        salvaged[field] = [v for v in values if isinstance(v, str)] if isinstance(values, list) else []
+    corrections = []
+    for item in data.get("sample_corrections") or []:
+        try:
+            corrections.append(SampleCorrection.model_validate(item))
+        except ValidationError:
+            continue
+    salvaged["sample_corrections"] = corrections
+    try:
+        return IELTSFeedbackSchema.model_validate(salvaged)
+    except ValidationError:
+        return None
+
+
+def get_generation_config() -> dict:
+    """Request JSON constrained to IELTSFeedbackSchema"""
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": IELTSFeedbackSchema,
+    }
+
+
+async def generate_content(model, prompt: str, **kwargs):
+    """
+    Call Gemini bounded by GEMINI_TIMEOUT_SECONDS and the current request deadline
+
+    Raises asyncio.TimeoutError when the time runs out.
+    """
+    timeout = stage_timeout(settings.GEMINI_TIMEOUT_SECONDS)
+    with stage_timer("feedback", "gemini"):
+        return await asyncio.wait_for(
+            model.generate_content_async(
+                prompt,
+                generation_config=get_generation_config(),
+                request_options={"timeout": timeout},
+                **kwargs
+            ),
+            timeout
+        )
+
+
+def has_gemini_budget() -> bool:
+    """Whether the current request deadline (if any) leaves time for a Gemini call"""
+    deadline = current_deadline()
+    return deadline is None or deadline.has(settings.GEMINI_MIN_BUDGET_SECONDS)
+
+
+def deadline_fallback(transcription: str, part: int) -> Optional[IELTSFeedback]:
+    """Local estimate when a request deadline cut Gemini short; None outside a deadline"""
+    if current_deadline() is None:
+        return None
+    from app.services.local_scoring import estimate_feedback
+    logger.warning("Not enough time left for Gemini, using local band estimate")
+    FEEDBACK_FALLBACKS.inc(reason="deadline")
+    with stage_timer("feedback", "local"):
+        return estimate_feedback(transcription, part)
+
+
+async def repair_feedback_response(model, response_text: str, error: FeedbackParseError) -> IELTSFeedbackSchema:
+    """Ask the model once to fix a response that failed validation"""
+    template = get_template(FEEDBACK_REPAIR_TEMPLATE)
+    prompt = template.render(errors=str(error), response=response_text)
+    start = time.perf_counter()
+    response = await generate_content(model, prompt)
+    record_usage(template, response, time.perf_counter() - start)
+    return parse_feedback_response(response.text)
+
+
+async def generate_validated_feedback(model, prompt: str, template: PromptTemplate):
+    """
+    Generate schema-constrained feedback, with at most GEMINI_REPAIR_ATTEMPTS
+    repair calls and a final partial salvage before giving up
+
+    Returns (IELTSFeedbackSchema, usage dict)
+    """
+    start = time.perf_counter()
+    response = await generate_content(model, prompt)
+    usage = record_usage(template, response, time.perf_counter() - start)
+    parsed = await validate_feedback_response(model, response.text)
+    return parsed, usage
+
+
+async def validate_feedback_response(model, response_text: str) -> IELTSFeedbackSchema:
+    """
+    Validate a complete response, with at most GEMINI_REPAIR_ATTEMPTS repair
+    calls and a final partial salvage before giving up
+
+    Raises FeedbackParseError if nothing usable could be recovered.
+    """
+    try:
+        parsed = parse_feedback_response(response_text)
+        FEEDBACK_PARSE_RESULTS.inc(outcome="ok")
+        return parsed
+    except FeedbackParseError as e:
+        FEEDBACK_PARSE_FAILURES.inc(attempt="initial")
+        logger.warning(f"Gemini feedback failed validation, attempting repair: {e}")
+        error = e
+
+    for _ in range(settings.GEMINI_REPAIR_ATTEMPTS):
+        if not has_gemini_budget():
+            break
+        try:
+            parsed = await repair_feedback_response(model, response_text, error)
+            FEEDBACK_PARSE_RESULTS.inc(outcome="repaired")
+            return parsed
+        except FeedbackParseError as e:
+            FEEDBACK_PARSE_FAILURES.inc(attempt="repair")
+            error = FeedbackParseError(str(e), data=e.data or error.data)
+
+    parsed = salvage_feedback(error.data)
+    if parsed is not None:
+        FEEDBACK_PARSE_RESULTS.inc(outcome="salvaged")
+        logger.warning("Using partially valid Gemini feedback")
+        return parsed
+
+    FEEDBACK_PARSE_RESULTS.inc(outcome="failed")
+    raise error
+
+
+def to_ielts_feedback(parsed: IELTSFeedbackSchema, usage: Optional[dict] = None) -> IELTSFeedback:
+    """Convert validated model output to the IELTSFeedback dataclass"""
+    return IELTSFeedback(
+        fluency_score=Decimal(str(parsed.fluency_score)),
+        vocabulary_score=Decimal(str(parsed.vocabulary_score)),
+        grammar_score=Decimal(str(parsed.grammar_score)),
+        pronunciation_score=Decimal(str(parsed.pronunciation_score)),
+        overall_band=Decimal(str(parsed.overall_band)),
+        feedback=parsed.feedback,
+        strengths=parsed.strengths,
+        improvements=parsed.improvements,
+        sample_corrections=[c.model_dump() for c in parsed.sample_corrections],
+        usage=usage
+    )
+
+
 def get_part_description(part: int) -> str:
     """Get description for IELTS part"""
     descriptions = {
@@ -157,6 +524,38 @@ def get_part_description(part: int) -> str:
     return descriptions.get(part, f"Part {part}")
 
 
+def is_too_short(transcription: str) -> bool:
+    return not transcription or len(transcription.strip()) < 10
+
+
+def short_answer_feedback() -> IELTSFeedback:
+    """Fixed feedback for empty or very short transcriptions"""
+    return IELTSFeedback(
+        fluency_score=Decimal("0.0"),
+        vocabulary_score=Decimal("0.0"),
+        grammar_score=Decimal("0.0"),
+        pronunciation_score=Decimal("0.0"),
+        overall_band=Decimal("0.0"),
+        feedback="Không phát hiện được câu trả lời hoặc câu trả lời quá ngắn để đánh giá. Hãy thử nói rõ ràng hơn và với tốc độ bình thường. Với Part 1, hãy trả lời 2-4 câu. Với Part 2, nói trong 1-2 phút. Với Part 3, cung cấp câu trả lời chi tiết với ví dụ.",
+        strengths=[],
+        improvements=[
+            "Cung cấp câu trả lời dài hơn",
+            "Nói rõ ràng vào microphone",
+            "Trả lời trực tiếp vào câu hỏi"
+        ],
+        sample_corrections=[]
+    )
+
+
+def render_examiner_prompt(template: PromptTemplate, transcription: str, question: str, part: int) -> str:
+    """Format the per-answer part of the examiner prompt"""
+    return template.render(
+        part=get_part_description(part),
+        question=question,
+        transcription=transcription
+    )
+
+
 async def get_ielts_feedback(
     transcription: str,
     question: str,
@@ -173,63 +572,123 @@ async def get_ielts_feedback(
     Returns:
         IELTSFeedback object with scores and detailed feedback, or None if unavailable
     """
-    model = get_gemini_client()
+    template = get_examiner_template()
+    model = get_gemini_client(template)
     if not model:
         logger.warning("Gemini client not available, returning None")
         return None
     
     # Handle empty or very short transcriptions
-    if not transcription or len(transcription.strip()) < 10:
-        return IELTSFeedback(
-            fluency_score=Decimal("0.0"),
-            vocabulary_score=Decimal("0.0"),
-            grammar_score=Decimal("0.0"),
-            pronunciation_score=Decimal("0.0"),
-            overall_band=Decimal("0.0"),
-            feedback="Không phát hiện được câu trả lời hoặc câu trả lời quá ngắn để đánh giá. Hãy thử nói rõ ràng hơn và với tốc độ bình thường. Với Part 1, hãy trả lời 2-4 câu. Với Part 2, nói trong 1-2 phút. Với Part 3, cung cấp câu trả lời chi tiết với ví dụ.",
-            strengths=[],
-            improvements=[
-                "Cung cấp câu trả lời dài hơn",
-                "Nói rõ ràng vào microphone",
-                "Trả lời trực tiếp vào câu hỏi"
-            ],
-            sample_corrections=[]
-        )
+    if is_too_short(transcription):
+        return short_answer_feedback()
     
-    # Format the prompt
-    part_description = get_part_description(part)
-    prompt = IELTS_EXAMINER_PROMPT.format(
-        part=part_description,
-        question=question,
-        transcription=transcription
-    )
+    # Degrade to a local estimate when the request deadline leaves no time for Gemini
+    if not has_gemini_budget():
+        return deadline_fallback(transcription, part)
+    
+    # Format the per-answer part of the prompt
+    prompt = render_examiner_prompt(template, transcription, question, part)
     
     try:
-        # Generate response using Gemini
-        response = model.generate_content(prompt)
-        response_text = response.text
-        
-        # Parse the JSON response
-        feedback_data = parse_gemini_response(response_text)
-        
-        # Create IELTSFeedback object
-        return IELTSFeedback(
-            fluency_score=Decimal(str(feedback_data.get("fluency_score", 5.0))),
-            vocabulary_score=Decimal(str(feedback_data.get("vocabulary_score", 5.0))),
-            grammar_score=Decimal(str(feedback_data.get("grammar_score", 5.0))),
-            pronunciation_score=Decimal(str(feedback_data.get("pronunciation_score", 5.0))),
-            overall_band=Decimal(str(feedback_data.get("overall_band", 5.0))),
-            feedback=feedback_data.get("feedback", ""),
-            strengths=feedback_data.get("strengths", []),
-            improvements=feedback_data.get("improvements", []),
-            sample_corrections=feedback_data.get("sample_corrections", [])
-        )
+        # Generate schema-constrained feedback using Gemini
+        parsed, usage = await generate_validated_feedback(model, prompt, template)
+        return to_ielts_feedback(parsed, usage)
         
+    except asyncio.TimeoutError:
+        logger.error("Gemini feedback timed out")
+        return deadline_fallback(transcription, part)
     except Exception as e:
         logger.error(f"Error getting Gemini feedback: {e}")
         return None
 
 
+def feedback_events(feedback: IELTSFeedback):
+    """Split complete feedback into the same (event, data) pairs stream_ielts_feedback emits"""
+    for field in SCORE_FIELDS:
+        yield "score", {"name": field, "value": float(getattr(feedback, field))}
+    for field in ("feedback", "strengths", "improvements", "sample_corrections"):
+        yield "field", {"name": field, "value": getattr(feedback, field)}
+
+
+async def stream_ielts_feedback(
+    transcription: str,
+    question: str,
+    part: int = 1
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Stream IELTS examiner feedback as it is generated
+
+    Yields ("score", {"name", "value"}) for each band score and
+    ("field", {"name", "value"}) for each narrative field as soon as the
+    model has produced it, then ("result", IELTSFeedback or None) once the
+    full response has been validated. Fields are emitted in the order the
+    model writes them; the final result is authoritative.
+    """
+    template = get_examiner_template()
+    model = get_gemini_client(template)
+    if not model:
+        logger.warning("Gemini client not available, returning None")
+        yield "result", None
+        return
+
+    if is_too_short(transcription):
+        feedback = short_answer_feedback()
+        for event in feedback_events(feedback):
+            yield event
+        yield "result", feedback
+        return
+
+    if not has_gemini_budget():
+        feedback = deadline_fallback(transcription, part)
+        for event in feedback_events(feedback):
+            yield event
+        yield "result", feedback
+        return
+
+    prompt = render_examiner_prompt(template, transcription, question, part)
+    parser = IncrementalJSONObjectParser()
+    chunks = []
+
+    try:
+        start = time.perf_counter()
+        # One budget for the whole stream, not per chunk
+        call_deadline = Deadline(stage_timeout(settings.GEMINI_TIMEOUT_SECONDS))
+        response = await generate_content(model, prompt, stream=True)
+        chunk_iterator = response.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunk_iterator.__anext__(), call_deadline.remaining())
+            except StopAsyncIteration:
+                break
+            text = chunk.text
+            chunks.append(text)
+            for name, value in parser.feed(text):
+                if name in SCORE_FIELDS:
+                    try:
+                        # Same checks as the final validation, applied early
+                        value = IELTSFeedbackSchema.check_band(float(value))
+                    except (TypeError, ValueError):
+                        continue
+                    yield "score", {"name": name, "value": value}
+                elif name in IELTSFeedbackSchema.model_fields:
+                    yield "field", {"name": name, "value": value}
+        usage = record_usage(template, response, time.perf_counter() - start)
+
+        parsed = await validate_feedback_response(model, "".join(chunks))
+        yield "result", to_ielts_feedback(parsed, usage)
+
+    except asyncio.TimeoutError:
+        logger.error("Gemini feedback stream timed out")
+        feedback = deadline_fallback(transcription, part)
+        if feedback is not None:
+            for event in feedback_events(feedback):
+                yield event
+        yield "result", feedback
+    except Exception as e:
+        logger.error(f"Error streaming Gemini feedback: {e}")
+        yield "result", None
+
+
 def format_feedback_text(feedback: IELTSFeedback) -> str:
     """Format IELTSFeedback into a readable text format for storage (Vietnamese)"""
     sections = []
@@ -1,18 +1,30 @@
 """
 Google Cloud Speech-to-Text service
 """
+import asyncio
 import os
 from pathlib import Path
 from typing import Optional
 import logging
 
-try:
-    from google.cloud import speech
-    GOOGLE_SPEECH_AVAILABLE = True
-except ImportError:
-    GOOGLE_SPEECH_AVAILABLE = False
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, stage_timeout
+from app.core.job_queue import QueueFullError
+from app.core.stage_metrics import stage_timer, TRANSCRIPTION_FALLBACKS
+from app.utils.optional_imports import module_available
+
+# The SDK is imported on first use (see load_speech_sdk) to keep startup fast
+GOOGLE_SPEECH_AVAILABLE = module_available("google.cloud.speech")
+if not GOOGLE_SPEECH_AVAILABLE:
     logging.warning("Google Cloud Speech library not installed. Install with: pip install google-cloud-speech")
 
+
+def load_speech_sdk():
+    """Import and return the google.cloud.speech module (cached by Python after the first call)"""
+    from google.cloud import speech
+    return speech
+
+
 # Initialize client (will be None if credentials not available)
 _speech_client = None
 
@@ -29,7 +41,7 @@ def get_speech_client():
             # 1. GOOGLE_APPLICATION_CREDENTIALS environment variable
             # 2. gcloud CLI default credentials
             # 3. Service account key file
-            _speech_client = speech.SpeechClient()
+            _speech_client = load_speech_sdk().SpeechClient()
         except Exception as e:
             logging.error(f"Failed to initialize Google Cloud Speech client: {e}")
             return None
@@ -41,7 +53,8 @@ def transcribe_audio_google(
     audio_path: Path,
     language_code: str = "en-US",
     sample_rate_hertz: Optional[int] = None,
-    encoding: Optional[str] = None
+    encoding: Optional[str] = None,
+    timeout: Optional[float] = None
 ) -> str:
     """
     Transcribe audio file using Google Cloud Speech-to-Text API
@@ -51,6 +64,7 @@ def transcribe_audio_google(
         language_code: BCP-47 language code (default: "en-US")
         sample_rate_hertz: Sample rate in Hz (auto-detected if None)
         encoding: Audio encoding (auto-detected if None)
+        timeout: Seconds to wait for the recognize call (client default if None)
         
     Returns:
         Transcribed text string
@@ -64,6 +78,7 @@ def transcribe_audio_google(
     client = get_speech_client()
     if client is None:
         raise Exception("Google Cloud Speech client is not available. Check your credentials.")
+    speech = load_speech_sdk()
     
     try:
         # Read audio file
@@ -71,7 +86,7 @@ def transcribe_audio_google(
         if not audio_path.exists():
             raise Exception(f"Audio file not found: {audio_path}")
         
-        with open(audio_path, "rb") as audio_file:
+        with stage_timer("audio_decode", "google"), open(audio_path, "rb") as audio_file:
             content = audio_file.read()
         
         # Auto-detect encoding and sample rate if not provided
@@ -111,7 +126,7 @@ def transcribe_audio_google(
         audio = speech.RecognitionAudio(content=content)
         
         # Perform transcription
-        response = client.recognize(config=config, audio=audio)
+        response = client.recognize(config=config, audio=audio, timeout=timeout)
         
         # Extract transcription from response
         if not response.results:
@@ -201,3 +216,78 @@ def transcribe_with_fallback(
     
     return transcription, method
 
+
+async def transcribe_with_fallback_async(
+    audio_path: Path,
+    language_code: str = "en-US",
+    use_google: bool = True,
+    part: Optional[int] = None
+) -> tuple[str, str]:
+    """
+    Async variant of transcribe_with_fallback for request handlers
+
+    The Google call runs in a worker thread and the Whisper fallback goes
+    through the bounded Whisper job queue, so neither blocks the event loop.
+    ``part`` sets the job's priority in that queue (see
+    whisper_service.transcribe_audio_queued). Both stages are bounded by
+    the current request deadline, if any.
+
+    Raises:
+        QueueFullError: If Whisper is needed but its queue is full
+        DeadlineExceeded: If the deadline leaves no time for Whisper
+        Exception: If both transcription methods fail
+    """
+    from app.services import whisper_service
+
+    logger = logging.getLogger(__name__)
+    transcription = None
+    method = None
+    error = None
+
+    if use_google and GOOGLE_SPEECH_AVAILABLE:
+        try:
+            logger.info("🎤 Attempting transcription with Google Cloud Speech-to-Text...")
+            with stage_timer("transcription", "google"):
+                transcription = await asyncio.to_thread(
+                    transcribe_audio_google,
+                    audio_path,
+                    language_code=language_code,
+                    timeout=stage_timeout(settings.GOOGLE_STT_TIMEOUT_SECONDS)
+                )
+            method = "google"
+            logger.info("✅ Google Cloud Speech-to-Text succeeded")
+        except Exception as e:
+            error = str(e)
+            logger.warning(f"❌ Google Cloud Speech-to-Text failed: {error}")
+            logger.info("🔄 Falling back to Whisper...")
+
+    if not transcription:
+        if error:
+            TRANSCRIPTION_FALLBACKS.inc(from_engine="google", to_engine="whisper")
+        try:
+            logger.info("🎤 Attempting transcription with Whisper (local)...")
+            # Whisper times its own run; waiting in the queue is not transcription time
+            transcription = await whisper_service.transcribe_audio_queued(
+                audio_path,
+                part=part
+            )
+            if not transcription or not transcription.strip():
+                raise Exception("Whisper returned empty transcription")
+            method = "whisper"
+            logger.info("✅ Whisper transcription succeeded")
+        except QueueFullError:
+            logger.warning("❌ Whisper queue is full, rejecting transcription")
+            raise
+        except DeadlineExceeded as e:
+            logger.warning(f"❌ Skipping Whisper: {e}")
+            raise
+        except Exception as e:
+            whisper_error = str(e)
+            logger.error(f"❌ Whisper transcription failed: {whisper_error}")
+
+            if error:
+                raise Exception(f"Both transcription methods failed. Google: {error}. Whisper: {whisper_error}")
+            else:
+                raise Exception(f"Whisper transcription failed: {whisper_error}")
+
+    return transcription, method
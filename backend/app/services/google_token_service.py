@@ -0,0 +1,153 @@
+"""
+Google ID token verification
+Verifies ID tokens locally against Google's published signing keys (JWKS)
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+import httpx
+from jose import jwt, JWTError
+
+from app.core.config import settings
+from app.core.http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# Used when the certs response has no usable Cache-Control max-age
+DEFAULT_KEYS_MAX_AGE = 3600
+
+
+class GoogleTokenError(Exception):
+    """The ID token is malformed, expired, or not signed by Google for our client"""
+
+
+class GoogleKeysUnavailableError(Exception):
+    """Google's signing keys could not be fetched and no cached copy is available"""
+
+
+def parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """Extract max-age (seconds) from a Cache-Control header"""
+    if not cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
+
+class GoogleKeyCache:
+    """In-memory cache of Google's JWKS, refreshed according to Cache-Control"""
+
+    def __init__(self, certs_url: str):
+        self.certs_url = certs_url
+        self._keys: dict = {}
+        self._expires_at = 0.0
+        # Last fetch attempt, successful or not; bounds refetches for unknown kids
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self):
+        self._fetched_at = time.monotonic()
+        response = await get_http_client().get(self.certs_url)
+        response.raise_for_status()
+        jwks = response.json()
+        max_age = parse_max_age(response.headers.get("cache-control"))
+        self._keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+        self._expires_at = time.monotonic() + (max_age if max_age is not None else DEFAULT_KEYS_MAX_AGE)
+        logger.info(f"Fetched {len(self._keys)} Google signing keys (max-age={max_age})")
+
+    async def get_key(self, kid: str) -> dict:
+        """
+        Return the JWK for ``kid``, refreshing the key set when it has expired
+        or when the key id is unknown (Google rotated its keys early)
+
+        Unknown kids refetch at most once per GOOGLE_KEYS_MIN_REFRESH_SECONDS,
+        so forged tokens cannot make every login wait on Google's endpoint.
+        """
+        key = self._keys.get(kid)
+        if key is not None and time.monotonic() < self._expires_at:
+            return key
+        if key is None and self._refreshed_recently():
+            raise GoogleTokenError("Token signed with an unknown key")
+
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            key = self._keys.get(kid)
+            if time.monotonic() >= self._expires_at or (key is None and not self._refreshed_recently()):
+                try:
+                    await self._fetch()
+                except (httpx.HTTPError, ValueError) as e:
+                    if not self._keys:
+                        raise GoogleKeysUnavailableError(f"Failed to fetch Google signing keys: {e}")
+                    # Keep serving from the stale key set rather than failing every login
+                    logger.warning(f"Failed to refresh Google signing keys, using cached keys: {e}")
+                key = self._keys.get(kid)
+
+        if key is None:
+            raise GoogleTokenError("Token signed with an unknown key")
+        return key
+
+    def _refreshed_recently(self) -> bool:
+        """Whether the key set is current and was fetched within the minimum refresh interval"""
+        now = time.monotonic()
+        return (
+            self._fetched_at is not None
+            and now < self._expires_at
+            and now - self._fetched_at < settings.GOOGLE_KEYS_MIN_REFRESH_SECONDS
+        )
+
+    async def warm(self):
+        """Fetch the key set ahead of the first Google login (startup warm-up)"""
+        async with self._lock:
+            if not self._keys or time.monotonic() >= self._expires_at:
+                await self._fetch()
+
+    def clear(self):
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+
+
+_key_cache: Optional[GoogleKeyCache] = None
+
+
+def get_key_cache() -> GoogleKeyCache:
+    """Get or create the process-wide key cache for the configured certs URL"""
+    global _key_cache
+
+    if _key_cache is None or _key_cache.certs_url != settings.GOOGLE_CERTS_URL:
+        _key_cache = GoogleKeyCache(settings.GOOGLE_CERTS_URL)
+    return _key_cache
+
+
+async def verify_id_token(token: str, audience: str) -> dict:
+    """
+    Verify a Google ID token and return its claims
+
+    Checks the RS256 signature against Google's keys, expiry, audience
+    and issuer without calling Google's tokeninfo endpoint.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError as e:
+        raise GoogleTokenError(f"Malformed token: {e}")
+
+    kid = header.get("kid")
+    if not kid:
+        raise GoogleTokenError("Token has no key id")
+
+    key = await get_key_cache().get_key(kid)
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=GOOGLE_ISSUERS,
+            options={"verify_at_hash": False},
+        )
+    except JWTError as e:
+        raise GoogleTokenError(str(e))
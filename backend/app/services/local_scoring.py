@@ -0,0 +1,76 @@
+"""
+Fast local band estimate used when there is no time left for Gemini
+
+The estimate is deliberately conservative: it looks only at surface
+features of the transcription (length, lexical variety, sentence length,
+filler words) and never reports a band above LOCAL_MAX_BAND.
+"""
+import re
+from decimal import Decimal
+
+from app.services.gemini_feedback_service import IELTSFeedback, is_too_short, short_answer_feedback
+
+LOCAL_MIN_BAND = 3.0
+LOCAL_MAX_BAND = 7.0
+
+# Roughly how many words a complete answer has in each part
+EXPECTED_WORDS = {1: 40, 2: 180, 3: 90}
+
+FILLER_WORDS = {"um", "uh", "er", "erm", "ah", "hmm"}
+
+LOCAL_FEEDBACK = (
+    "Đây là điểm ước tính nhanh vì hệ thống chấm điểm AI không kịp xử lý trong thời gian cho phép. "
+    "Điểm chỉ dựa trên độ dài, sự đa dạng từ vựng và độ dài câu trong bản ghi. "
+    "Hãy thử lại để nhận phản hồi chi tiết từ giám khảo AI."
+)
+
+
+def _band(value: float) -> Decimal:
+    value = min(LOCAL_MAX_BAND, max(LOCAL_MIN_BAND, value))
+    return Decimal(str(round(value * 2) / 2))
+
+
+def estimate_feedback(transcription: str, part: int = 1) -> IELTSFeedback:
+    """Estimate IELTS bands from the transcription text alone"""
+    if is_too_short(transcription):
+        return short_answer_feedback()
+
+    words = re.findall(r"[A-Za-z']+", transcription.lower())
+    sentences = [s for s in re.split(r"[.!?]+", transcription) if s.strip()]
+    word_count = len(words)
+    fillers = sum(1 for w in words if w in FILLER_WORDS)
+    content_words = [w for w in words if w not in FILLER_WORDS]
+
+    length_ratio = min(1.0, word_count / EXPECTED_WORDS.get(part, 90))
+    filler_ratio = fillers / word_count
+    variety = len(set(content_words)) / max(1, len(content_words))
+    avg_sentence_words = word_count / max(1, len(sentences))
+
+    fluency = 4.0 + 3.0 * length_ratio - 10.0 * filler_ratio
+    vocabulary = 3.5 + 5.0 * variety * length_ratio
+    # Very short or run-on sentences both suggest limited grammatical control
+    grammar = 6.5 - abs(avg_sentence_words - 14) / 6
+    pronunciation = (fluency + grammar) / 2  # not measurable from text; keep it in line with the rest
+
+    scores = [_band(fluency), _band(vocabulary), _band(grammar), _band(pronunciation)]
+    overall = _band(sum(float(s) for s in scores) / len(scores))
+
+    improvements = []
+    if length_ratio < 1.0:
+        improvements.append("Phát triển câu trả lời dài hơn với lý do và ví dụ cụ thể")
+    if filler_ratio > 0.03:
+        improvements.append("Giảm các từ đệm như 'um', 'uh' để nói trôi chảy hơn")
+    if variety < 0.5:
+        improvements.append("Sử dụng từ vựng đa dạng hơn, tránh lặp lại từ")
+
+    return IELTSFeedback(
+        fluency_score=scores[0],
+        vocabulary_score=scores[1],
+        grammar_score=scores[2],
+        pronunciation_score=scores[3],
+        overall_band=overall,
+        feedback=LOCAL_FEEDBACK,
+        strengths=[],
+        improvements=improvements,
+        sample_corrections=[]
+    )
@@ -0,0 +1,67 @@
+"""
+Versioned prompt templates for LLM calls
+
+A template has an optional static ``system_instruction`` (sent once per
+model and eligible for caching) and a ``user_template`` that is filled
+with the per-request variables.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A named, versioned prompt"""
+    name: str
+    version: str
+    user_template: str
+    system_instruction: Optional[str] = None
+    description: str = ""
+    fingerprint: str = field(init=False)
+
+    def __post_init__(self):
+        digest = hashlib.sha256(
+            f"{self.system_instruction or ''}\x00{self.user_template}".encode("utf-8")
+        ).hexdigest()[:12]
+        object.__setattr__(self, "fingerprint", digest)
+
+    @property
+    def key(self) -> str:
+        """Identifier used for metrics, model caching and logs"""
+        return f"{self.name}@{self.version}"
+
+    def render(self, **variables) -> str:
+        """Fill the per-request part of the prompt"""
+        return self.user_template.format(**variables)
+
+
+_templates: Dict[str, Dict[str, PromptTemplate]] = {}
+_defaults: Dict[str, str] = {}
+
+
+def register_template(template: PromptTemplate, default: bool = False) -> PromptTemplate:
+    """Register a template; the first version registered for a name is the default unless overridden"""
+    versions = _templates.setdefault(template.name, {})
+    if template.version in versions and versions[template.version] != template:
+        raise ValueError(f"Template {template.key} is already registered with different content")
+    versions[template.version] = template
+    if default or template.name not in _defaults:
+        _defaults[template.name] = template.version
+    return template
+
+
+def get_template(name: str, version: Optional[str] = None) -> PromptTemplate:
+    """Look up a template by name and version (default version when omitted)"""
+    versions = _templates.get(name)
+    if not versions:
+        raise KeyError(f"Unknown prompt template: {name}")
+    version = version or _defaults[name]
+    if version not in versions:
+        raise KeyError(f"Unknown version {version} for prompt template {name}. Available: {', '.join(versions)}")
+    return versions[version]
+
+
+def list_templates() -> Dict[str, list]:
+    """Registered template versions by name"""
+    return {name: sorted(versions) for name, versions in _templates.items()}
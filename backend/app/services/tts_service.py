@@ -13,8 +13,7 @@ MAMBA_ENV = "whisper"  # Using the same mamba environment as Whisper
 # Get absolute path to uploads directory (relative to backend directory)
 # This file is in backend/app/services/, so go up 2 levels to backend/
 BACKEND_DIR = Path(__file__).parent.parent.parent.resolve()
-TTS_OUTPUT_DIR = BACKEND_DIR / "uploads" / "tts"
-TTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+TTS_OUTPUT_DIR = BACKEND_DIR / "uploads" / "tts"  # created at startup (see app.main lifespan)
 
 # Voice description for ParlerTTS
 VOICE_DESCRIPTION = "A clear, professional English voice with neutral accent, suitable for IELTS speaking practice questions."
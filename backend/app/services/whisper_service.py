@@ -1,25 +1,80 @@
 """
 Whisper transcription service using mamba environment
 """
+import asyncio
+import functools
 import subprocess
 import json
 import os
+import wave
 from pathlib import Path
 from typing import Optional
 
+from app.core.config import settings
+from app.core.constants import EXPECTED_ANSWER_SECONDS, DEFAULT_EXPECTED_ANSWER_SECONDS
+from app.core.job_queue import JobQueue
+from app.core.deadline import Deadline, DeadlineExceeded, current_deadline
+from app.core.stage_metrics import stage_timer
+
 # Path to mamba/conda environment activation
 MAMBA_ENV = "whisper"
 WHISPER_MODEL = "turbo"
 WHISPER_LANGUAGE = "en"
 
+# Each Whisper run is a CPU-heavy process; running too many at once makes all of them slow
+whisper_queue = JobQueue(
+    "whisper",
+    max_concurrency=settings.WHISPER_MAX_CONCURRENCY,
+    max_queue=settings.WHISPER_MAX_QUEUE,
+    aging_factor=settings.WHISPER_AGING_FACTOR
+)
+
+
+@functools.lru_cache(maxsize=1)
+def get_mamba_base() -> str:
+    """
+    Base path of the mamba installation, looked up once per process
 
-def transcribe_audio(audio_path: Path, output_dir: Optional[Path] = None) -> str:
+    Failures are not cached, so a later call retries the lookup.
+    """
+    try:
+        mamba_base_result = subprocess.run(
+            ["mamba", "info", "--base"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=10
+        )
+        # Extract path from output (might include extra text like "base environment : /path")
+        output = mamba_base_result.stdout.strip()
+        # If output contains ":", extract the path after the last colon and space
+        if ":" in output:
+            mamba_base = output.split(":")[-1].strip()
+        else:
+            mamba_base = output
+
+        # Remove any trailing whitespace or newlines
+        mamba_base = mamba_base.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
+        raise Exception(f"Failed to get mamba base path. Make sure mamba is installed and in PATH: {e}")
+
+    if not mamba_base or not os.path.exists(mamba_base):
+        raise Exception(f"Invalid mamba base path: {mamba_base}")
+    return mamba_base
+
+
+def transcribe_audio(
+    audio_path: Path,
+    output_dir: Optional[Path] = None,
+    timeout: float = settings.WHISPER_TIMEOUT_SECONDS
+) -> str:
     """
     Transcribe audio file using Whisper in mamba environment
     
     Args:
         audio_path: Path to the audio file
         output_dir: Optional directory for output files
+        timeout: Seconds to let the Whisper process run
         
     Returns:
         Transcribed text string
@@ -36,29 +91,7 @@ def transcribe_audio(audio_path: Path, output_dir: Optional[Path] = None) -> str
             output_dir.mkdir(parents=True, exist_ok=True)
         
         # Get mamba base path first
-        try:
-            mamba_base_result = subprocess.run(
-                ["mamba", "info", "--base"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=10
-            )
-            # Extract path from output (might include extra text like "base environment : /path")
-            output = mamba_base_result.stdout.strip()
-            # If output contains ":", extract the path after the last colon and space
-            if ":" in output:
-                mamba_base = output.split(":")[-1].strip()
-            else:
-                mamba_base = output
-            
-            # Remove any trailing whitespace or newlines
-            mamba_base = mamba_base.strip()
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-            raise Exception(f"Failed to get mamba base path. Make sure mamba is installed and in PATH: {e}")
-        
-        if not mamba_base or not os.path.exists(mamba_base):
-            raise Exception(f"Invalid mamba base path: {mamba_base}")
+        mamba_base = get_mamba_base()
         
         # Build Whisper command similar to whisper_note.md
         # Using bash to activate mamba environment and run whisper
@@ -77,7 +110,7 @@ def transcribe_audio(audio_path: Path, output_dir: Optional[Path] = None) -> str
             capture_output=True,
             text=True,
             check=False,
-            timeout=300  # 5 minute timeout
+            timeout=timeout
         )
         
         if result.returncode != 0:
@@ -102,7 +135,7 @@ def transcribe_audio(audio_path: Path, output_dir: Optional[Path] = None) -> str
         return transcription
         
     except subprocess.TimeoutExpired:
-        raise Exception("Whisper transcription timed out (exceeded 5 minutes)")
+        raise Exception(f"Whisper transcription timed out (exceeded {timeout:.0f} seconds)")
     except Exception as e:
         # Re-raise if it's already an Exception with our message
         if "Failed to get mamba base path" in str(e) or "Invalid mamba base path" in str(e):
@@ -110,6 +143,90 @@ def transcribe_audio(audio_path: Path, output_dir: Optional[Path] = None) -> str
         raise Exception(f"Transcription error: {str(e)}")
 
 
+def probe_audio_duration(audio_path: Path) -> Optional[float]:
+    """Audio duration in seconds, or None if it can't be determined"""
+    if audio_path.suffix.lower() == ".wav":
+        try:
+            with stage_timer("audio_decode", "wave"), wave.open(str(audio_path), "rb") as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except (wave.Error, OSError, ZeroDivisionError):
+            return None
+
+    # Whisper needs ffmpeg anyway, so ffprobe is normally available
+    try:
+        with stage_timer("audio_decode", "ffprobe"):
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(audio_path)],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            return float(result.stdout.strip())
+    except (subprocess.SubprocessError, FileNotFoundError, ValueError):
+        return None
+
+
+async def estimate_job_seconds(audio_path: Path, part: Optional[int] = None) -> float:
+    """Measured audio duration, falling back to the typical answer length for the part"""
+    duration = await asyncio.to_thread(probe_audio_duration, audio_path)
+    if duration:
+        return duration
+    return EXPECTED_ANSWER_SECONDS.get(part, DEFAULT_EXPECTED_ANSWER_SECONDS)
+
+
+def _run_whisper_job(audio_path: Path, output_dir: Optional[Path], deadline: Optional[Deadline]) -> str:
+    """
+    One Whisper run on a queue thread, observed as the transcription stage
+
+    Time spent waiting for the slot is in job_queue_wait_seconds instead.
+    Under a deadline the process gets the rest of the budget.
+    """
+    with stage_timer("transcription", "whisper"):
+        if deadline is None:
+            return transcribe_audio(audio_path, output_dir)
+        try:
+            return transcribe_audio(audio_path, output_dir, timeout=deadline.timeout(settings.WHISPER_TIMEOUT_SECONDS))
+        except Exception:
+            # Killed at the deadline: report it as such, not as a Whisper failure
+            if deadline.expired:
+                raise DeadlineExceeded("whisper", 0.0)
+            raise
+
+
+async def transcribe_audio_queued(
+    audio_path: Path,
+    output_dir: Optional[Path] = None,
+    part: Optional[int] = None
+) -> str:
+    """
+    Transcribe through the Whisper job queue
+
+    Shorter recordings start first (with aging so long ones still run).
+    Raises QueueFullError immediately if the queue is full.
+
+    Under a request deadline, the job only waits in the queue while at
+    least WHISPER_MIN_BUDGET_SECONDS would be left to run it, and the
+    process is killed when the deadline passes (DeadlineExceeded).
+    """
+    expected_seconds = await estimate_job_seconds(audio_path, part)
+    deadline = current_deadline()
+    if deadline is None:
+        return await whisper_queue.run(
+            _run_whisper_job, audio_path, output_dir, None,
+            expected_seconds=expected_seconds
+        )
+
+    deadline.check("whisper", settings.WHISPER_MIN_BUDGET_SECONDS)
+    try:
+        return await whisper_queue.run(
+            _run_whisper_job, audio_path, output_dir, deadline,
+            expected_seconds=expected_seconds,
+            wait_timeout=deadline.remaining() - settings.WHISPER_MIN_BUDGET_SECONDS
+        )
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("whisper", deadline.remaining())
+
+
 def transcribe_audio_simple(audio_path: Path) -> str:
     """
     Simplified transcription function using mamba environment
@@ -0,0 +1,71 @@
+"""
+Incremental parsing of a streamed JSON object
+
+Gemini streams structured output as arbitrary text chunks. This parser
+emits each top-level member of the object as soon as its value is
+complete, so callers can forward early fields (e.g. scores) without
+waiting for the rest of the document.
+"""
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """Feed text chunks, get back completed (key, value) pairs of the top-level object"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk and return the members completed by it"""
+        self._buffer += chunk
+        members = []
+        buffer = self._buffer
+
+        while self._pos < len(buffer) and not self.done:
+            char = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._pos + 1
+            elif char in "}]":
+                if self._depth == 1:
+                    members.extend(self._complete_member(self._pos))
+                    self.done = True
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                members.extend(self._complete_member(self._pos))
+                self._member_start = self._pos + 1
+
+            self._pos += 1
+
+        return members
+
+    def _complete_member(self, end: int) -> List[Tuple[str, Any]]:
+        if self._member_start is None:
+            return []
+        text = self._buffer[self._member_start:end].strip()
+        if not text:
+            return []
+        try:
+            member = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            # Leave malformed members to the validation of the full response
+            return []
+        return list(member.items())
@@ -0,0 +1,17 @@
+"""
+Availability checks for optional dependencies that are imported on first use
+
+SDKs such as google-cloud-speech and google-generativeai pull in gRPC and
+protobuf and take hundreds of milliseconds to import, so services only
+check that they are installed at import time and load them when needed.
+"""
+import importlib.util
+
+
+def module_available(name: str) -> bool:
+    """Whether ``name`` is installed, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # A missing parent package raises instead of returning None
+        return False
@@ -0,0 +1,85 @@
+"""
+Pagination and field projection helpers for list endpoints
+"""
+from typing import List, Optional, Sequence
+from fastapi import HTTPException, Response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated ``fields`` query parameter into a list of column names
+
+    Returns None when no projection was requested. ``id`` is always included
+    so clients can keep paginating with the cursor.
+    """
+    if not fields:
+        return None
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+
+    if "id" not in requested:
+        requested.insert(0, "id")
+    # Preserve request order but drop duplicates
+    return list(dict.fromkeys(requested))
+
+
+def page_size(limit: Optional[int], offset: int = 0, after_id: Optional[int] = None) -> Optional[int]:
+    """
+    Effective page size for a list request
+
+    Requests without ``limit``, ``offset`` or ``after_id`` get the full list
+    (None), as before pagination existed; paging without an explicit limit
+    uses DEFAULT_PAGE_SIZE.
+    """
+    if limit is not None:
+        return limit
+    if offset or after_id is not None:
+        return DEFAULT_PAGE_SIZE
+    return None
+
+
+def paginate(query, model, limit: Optional[int], offset: int = 0, after_id: Optional[int] = None):
+    """
+    Apply stable ordering plus cursor (``after_id``) or offset pagination to a query
+
+    Ordering is always by primary key so pages never overlap or skip rows
+    when new rows are inserted between requests. ``limit=None`` returns
+    every row.
+    """
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    query = query.order_by(model.id)
+    if offset and after_id is None:
+        query = query.offset(offset)
+    return query if limit is None else query.limit(limit)
+
+
+def project(query, model, fields: Optional[List[str]]):
+    """Restrict a query to the selected columns when a projection was requested"""
+    if fields is None:
+        return query
+    return query.with_entities(*[getattr(model, f) for f in fields])
+
+
+def rows_to_items(rows, fields: Optional[List[str]]):
+    """Convert projected rows to dicts; full ORM objects are returned unchanged"""
+    if fields is None:
+        return rows
+    return [row._asdict() for row in rows]
+
+
+def set_pagination_headers(response: Response, items, limit: Optional[int]):
+    """Expose the next cursor so clients can request the following page"""
+    if limit is not None and len(items) == limit and items:
+        last = items[-1]
+        last_id = last["id"] if isinstance(last, dict) else last.id
+        response.headers["X-Next-Cursor"] = str(last_id)
@@ -5,6 +5,7 @@ from datetime import date
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app import models
+from app.core.progress_cache import mark_progress_changed
 
 
 def update_daily_progress(db: Session, user_id: int, today: date = None) -> models.DailyProgress:
@@ -125,6 +126,8 @@ def update_streak(db: Session, user_id: int, today: date = None) -> models.Strea
 def update_all_progress(db: Session, user_id: int, part: int, today: date = None):
     """
     Update all progress metrics for a user (daily, activity, part, streak)
+
+    The user's cached progress responses are invalidated when ``db`` commits.
     """
     if today is None:
         today = date.today()
@@ -133,3 +136,4 @@ def update_all_progress(db: Session, user_id: int, part: int, today: date = None
     update_activity_calendar(db, user_id, today)
     update_part_progress(db, user_id, part)
     update_streak(db, user_id, today)
+    mark_progress_changed(db, user_id)
@@ -0,0 +1,5 @@
+"""
+Benchmark scripts for the backend API
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_questions``
+"""
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the analytics endpoints at increasing history sizes
+
+Generates one user per size with a multi-year synthetic history (see
+benchmarks/synthetic_data.py) and measures the latency and response size
+of each analytics endpoint for that user (decoded, and on the wire with
+gzip/brotli negotiated), so endpoints whose cost grows with the length of
+a user's history show up before real users hit them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --sizes 10 1000 10000 50000 --repeat 20
+    python -m benchmarks.bench_analytics --database-url postgresql://localhost/anna_bench
+    python -m benchmarks.bench_analytics --progress-cache   # repeat loads served from the progress cache
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ENDPOINTS = [
+    ("streak-analytics", "/api/progress/streak-analytics", {}),
+    ("activity-calendar", "/api/progress/activity-calendar", {}),
+    ("dashboard", "/api/progress/dashboard", {}),
+    ("feedback stats", "/api/practice/feedback/stats/summary", {}),
+    ("feedback history", "/api/practice/feedback/history", {"limit": 20}),
+    ("history, page 50", "/api/practice/feedback/history", {"limit": 20, "offset": 1000}),
+]
+
+
+def measure(client, url: str, params: dict, headers: dict, repeat: int):
+    """Return (median ms, p95 ms, response bytes, bytes on the wire) for an endpoint"""
+    timings = []
+    size = wire = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, params=params, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        size = len(response.content)
+        wire = response.num_bytes_downloaded
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95, size, wire
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None,
+                        help="Database to run against (default: a fresh SQLite file in a temp directory)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 10_000], help="Sessions per user")
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--progress-cache", action="store_true",
+                        help="Leave the per-user progress cache on (default: off, so every request queries)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="anna-bench-") as workdir:
+        # The app builds its engines from DATABASE_URL at import time
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{Path(workdir) / 'analytics.db'}"
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        os.environ["WARMUP_ENABLED"] = "false"
+        os.environ["PROGRESS_CACHE_ENABLED"] = "true" if args.progress_cache else "false"
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import select
+
+        from app import models
+        from app.auth import create_user_access_token
+        from app.database import Base, SessionLocal, engine
+        from app.main import app
+        from benchmarks.synthetic_data import generate
+
+        Base.metadata.create_all(engine)
+        print(f"{'sessions':>8}  {'endpoint':<18} {'median ms':>10} {'p95 ms':>8} {'bytes':>8} {'wire':>8}")
+        print("-" * 67)
+        with TestClient(app) as client:
+            for size in args.sizes:
+                user_id, = generate(engine, users=1, sessions_per_user=size, years=args.years, seed=args.seed)
+                with SessionLocal() as db:
+                    user = db.scalar(select(models.User).where(models.User.id == user_id))
+                    headers = {"Authorization": f"Bearer {create_user_access_token(user)}"}
+
+                for name, url, params in ENDPOINTS:
+                    median, p95, nbytes, wire = measure(client, url, params, headers, args.repeat)
+                    print(f"{size:>8}  {name:<18} {median:>10.2f} {p95:>8.2f} {nbytes:>8} {wire:>8}")
+                print()
+
+
+if __name__ == "__main__":
+    main()
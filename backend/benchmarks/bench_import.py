@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the application
+
+Imports ``app.main`` in fresh interpreters under ``python -X importtime``,
+reports the total and the slowest top-level packages, and checks the
+total against IMPORT_TIME_BUDGET_MS. It also checks that the heavy SDKs
+which are meant to load on first use (LAZY_MODULES) are not imported.
+test_import_time.py runs the same checks.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --runs 5 --top 20 --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Best of several runs, so a noisy machine does not fail the budget
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+# gRPC/protobuf SDK stacks that must only load when first used
+LAZY_MODULES = ("google.generativeai", "google.cloud.speech", "grpc")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+_PROBE = (
+    "import sys, {module}; "
+    "print('LOADED=' + ','.join(m for m in {modules!r} if m in sys.modules))"
+)
+
+
+def measure_import(module: str = "app.main") -> dict:
+    """Import ``module`` in a fresh interpreter and parse its -X importtime output"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, modules=LAZY_MODULES)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    total_us = 0
+    self_by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        self_by_package[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    loaded = ""
+    for line in result.stdout.splitlines():
+        if line.startswith("LOADED="):
+            loaded = line[len("LOADED="):]
+    return {
+        "total_ms": total_us / 1000,
+        "packages_ms": {name: us / 1000 for name, us in self_by_package.items()},
+        "lazy_modules_loaded": [name for name in loaded.split(",") if name],
+    }
+
+
+def best_of(runs: int) -> dict:
+    """The fastest of ``runs`` measurements"""
+    return min((measure_import() for _ in range(runs)), key=lambda m: m["total_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="How many packages to list")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    args = parser.parse_args()
+
+    result = best_of(args.runs)
+    print(f"{'package':<28} {'self ms':>8}")
+    print("-" * 37)
+    for name, ms in sorted(result["packages_ms"].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<28} {ms:>8.1f}")
+    print(f"\nimport app.main: {result['total_ms']:.0f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})")
+
+    ok = True
+    if result["lazy_modules_loaded"]:
+        print(f"❌ Imported at startup but should load lazily: {', '.join(result['lazy_modules_loaded'])}")
+        ok = False
+    if result["total_ms"] > args.budget_ms:
+        print("❌ Over the import-time budget")
+        ok = False
+    if ok:
+        print("✅ Within budget")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the API with fake speech and LLM services
+
+Boots the app under uvicorn in-process against a local SQLite file (or
+the Postgres given by --database-url), replaces Google STT, Whisper and
+Gemini with configurable-latency fakes (see benchmarks/fakes.py) and
+drives a mix of realistic user flows at increasing concurrency:
+
+    dashboard  the aggregated dashboard endpoint plus streak analytics
+    browse     question list, question detail and the user's sessions for it
+    analyze    an answer recording submitted to /api/practice/analyze
+
+For each concurrency level it reports throughput, p50/p95/p99 latency and
+the error rate per endpoint, and can save the results as a JSON baseline
+and compare a run against one.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --concurrency 1 8 32 --duration 20 --save benchmarks/baseline.json
+    python -m benchmarks.bench_load --database-url postgresql://localhost/anna_bench --compare benchmarks/baseline.json
+    python -m benchmarks.bench_load --mix dashboard=6,browse=3,analyze=1 --gemini-latency 2.5 --stt-failure-rate 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_MIX = "dashboard=5,browse=3,analyze=2"
+DASHBOARD_ENDPOINTS = ["dashboard", "streak-analytics"]
+TOPICS = ["Work", "Study", "Hometown", "Travel", "Technology", "Food", "Music", "Sport"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None,
+                        help="Database to run against (default: a fresh SQLite file in a temp directory)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run each concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Relative weights of the user flows")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between flows of one virtual user")
+    parser.add_argument("--stt-latency", type=float, default=0.4)
+    parser.add_argument("--stt-failure-rate", type=float, default=0.05,
+                        help="Share of Google STT calls that fail and fall back to Whisper")
+    parser.add_argument("--whisper-latency", type=float, default=2.0)
+    parser.add_argument("--gemini-latency", type=float, default=1.2)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction of the mean")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", type=Path, help="Write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", type=Path, help="Compare the results against a saved JSON baseline")
+    return parser.parse_args()
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in FLOWS:
+            raise SystemExit(f"Unknown flow '{name}' in --mix (choose from {', '.join(FLOWS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def configure_environment(args, workdir: Path):
+    """Point the app at the benchmark database; must run before the app is imported"""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir / 'bench.db'}"
+    # The benchmark measures capacity, not the per-user limits
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ.setdefault("TRACING_EXPORTER", "none")
+
+
+def silent_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    """A small valid WAV file, so the duration probe needs no ffprobe"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def seed(n_users: int, n_questions: int) -> tuple[list, dict]:
+    """Create tables, questions and users; return (auth headers per user, question ids per part)"""
+    from sqlalchemy import func, insert, select
+
+    from app import models
+    from app.auth import create_user_access_token, get_password_hash
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        if db.scalar(select(func.count()).select_from(models.Question)) < n_questions:
+            db.execute(insert(models.Question), [
+                {
+                    "part": i % 3 + 1,
+                    "topic": TOPICS[i % len(TOPICS)],
+                    "question_text": f"Question {i}: talk about {TOPICS[i % len(TOPICS)].lower()} in your life."
+                }
+                for i in range(n_questions)
+            ])
+        # One hash for everyone: the benchmark is not about bcrypt
+        password_hash = get_password_hash("benchmark")
+        run_id = uuid.uuid4().hex[:8]
+        users = [
+            models.User(username=f"bench_{run_id}_{i}", email=f"bench_{run_id}_{i}@example.com",
+                        password_hash=password_hash)
+            for i in range(n_users)
+        ]
+        db.add_all(users)
+        db.commit()
+        headers = [{"Authorization": f"Bearer {create_user_access_token(user)}"} for user in users]
+
+        questions = defaultdict(list)
+        for question_id, part in db.execute(select(models.Question.id, models.Question.part)):
+            questions[part].append(question_id)
+    return headers, dict(questions)
+
+
+class Recorder:
+    """Latencies and errors per endpoint for one concurrency level"""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except Exception:
+            response = None
+            failed = True
+        self.timings[name].append((time.perf_counter() - start) * 1000)
+        if failed:
+            self.errors[name] += 1
+        return response
+
+
+async def dashboard_flow(client, recorder: Recorder, headers: dict, questions: dict, audio: bytes):
+    # The dashboard fires its requests together
+    await asyncio.gather(*(
+        recorder.request(client, f"GET /api/progress/{endpoint}", "GET", f"/api/progress/{endpoint}", headers=headers)
+        for endpoint in DASHBOARD_ENDPOINTS
+    ))
+
+
+async def browse_flow(client, recorder: Recorder, headers: dict, questions: dict, audio: bytes):
+    part = random.choice(sorted(questions))
+    question_id = random.choice(questions[part])
+    await recorder.request(client, "GET /api/questions/", "GET", "/api/questions/",
+                           params={"part": part, "fields": "id,topic,question_text"})
+    await recorder.request(client, "GET /api/questions/{id}", "GET", f"/api/questions/{question_id}")
+    await recorder.request(client, "GET /api/practice/question/{id}", "GET",
+                           f"/api/practice/question/{question_id}", headers=headers)
+
+
+async def analyze_flow(client, recorder: Recorder, headers: dict, questions: dict, audio: bytes):
+    part = random.choice(sorted(questions))
+    await recorder.request(
+        client, "POST /api/practice/analyze", "POST", "/api/practice/analyze",
+        headers=headers,
+        data={"question_id": str(random.choice(questions[part])), "part": str(part)},
+        files={"audio": ("answer.wav", audio, "audio/wav")}
+    )
+
+
+FLOWS = {
+    "dashboard": dashboard_flow,
+    "browse": browse_flow,
+    "analyze": analyze_flow,
+}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for name, timings in sorted(recorder.timings.items()):
+        timings = sorted(timings)
+        endpoints[name] = {
+            "requests": len(timings),
+            "throughput_rps": round(len(timings) / elapsed, 2),
+            "p50_ms": round(percentile(timings, 50), 1),
+            "p95_ms": round(percentile(timings, 95), 1),
+            "p99_ms": round(percentile(timings, 99), 1),
+            "error_rate": round(recorder.errors[name] / len(timings), 4),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(recorder.errors.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def run_level(base_url: str, concurrency: int, args, weights: dict, headers: list, questions: dict) -> dict:
+    """Run ``concurrency`` virtual users in a closed loop for ``args.duration`` seconds"""
+    import httpx
+
+    recorder = Recorder()
+    audio = silent_wav()
+    flows = list(weights)
+    flow_weights = [weights[name] for name in flows]
+    limits = httpx.Limits(max_connections=concurrency * len(DASHBOARD_ENDPOINTS))
+    stop_at = time.perf_counter() + args.duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def virtual_user(index: int):
+            user_headers = headers[index % len(headers)]
+            while time.perf_counter() < stop_at:
+                flow = FLOWS[random.choices(flows, flow_weights)[0]]
+                await flow(client, recorder, user_headers, questions, audio)
+                if args.think_ms:
+                    await asyncio.sleep(args.think_ms / 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {"concurrency": concurrency, **summarize(recorder, elapsed)}
+
+
+def start_server(app) -> tuple:
+    """Run the app under uvicorn on a free local port in a background thread"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("uvicorn failed to start")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def print_level(result: dict):
+    print(f"\nconcurrency {result['concurrency']}: {result['throughput_rps']} req/s, "
+          f"error rate {result['error_rate']:.1%}")
+    print(f"  {'endpoint':<34} {'reqs':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in result["endpoints"].items():
+        print(f"  {name:<34} {stats['requests']:>6} {stats['throughput_rps']:>7} {stats['p50_ms']:>8} "
+              f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['error_rate']:>7.1%}")
+
+
+def compare(results: dict, baseline: dict):
+    """Print p95 and throughput changes against a baseline, per level and endpoint"""
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\nCompared with baseline from {baseline.get('meta', {}).get('created_at', 'unknown')}:")
+    print(f"  {'conc':>4}  {'endpoint':<34} {'p95 ms':>17} {'req/s':>17} {'errors':>15}")
+    for level in results["levels"]:
+        base = baseline_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        for name, stats in level["endpoints"].items():
+            old = base["endpoints"].get(name)
+            if old is None:
+                continue
+            p95_change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+            print(f"  {level['concurrency']:>4}  {name:<34} "
+                  f"{old['p95_ms']:>7} → {stats['p95_ms']:<7}"
+                  f"{old['throughput_rps']:>7} → {stats['throughput_rps']:<7}"
+                  f"{old['error_rate']:>6.1%} → {stats['error_rate']:<6.1%}"
+                  f"  ({p95_change:+.0%} p95)")
+
+
+def main():
+    args = parse_args()
+    weights = parse_mix(args.mix)
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="anna-bench-") as workdir:
+        workdir = Path(workdir)
+        configure_environment(args, workdir)
+
+        from app.core.config import settings
+        from app.main import app
+        from benchmarks.fakes import Latency, install_fakes
+
+        settings.UPLOAD_DIR = workdir / "uploads"
+        settings.UPLOAD_DIR.mkdir()
+        install_fakes(
+            stt=Latency(args.stt_latency, args.jitter, args.stt_failure_rate),
+            whisper=Latency(args.whisper_latency, args.jitter),
+            gemini=Latency(args.gemini_latency, args.jitter, args.gemini_failure_rate),
+        )
+        headers, questions = seed(args.users, args.questions)
+
+        server, thread, base_url = start_server(app)
+        levels = []
+        try:
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_level(base_url, concurrency, args, weights, headers, questions))
+                print_level(result)
+                levels.append(result)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=30)
+
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "database": "postgresql" if (args.database_url or "").startswith("postgres") else "sqlite",
+            "duration_s": args.duration,
+            "mix": weights,
+            "users": args.users,
+            "questions": args.questions,
+            "latency": {
+                "stt": args.stt_latency,
+                "stt_failure_rate": args.stt_failure_rate,
+                "whisper": args.whisper_latency,
+                "gemini": args.gemini_latency,
+                "gemini_failure_rate": args.gemini_failure_rate,
+                "jitter": args.jitter,
+            },
+        },
+        "levels": levels,
+    }
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"\nSaved results to {args.save}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for per-request middleware overhead
+
+Calls a minimal FastAPI app directly through ASGI (no server, no HTTP
+client) with different middleware stacks and reports the mean time per
+request and the overhead over the bare app. It compares the old
+``@app.middleware("http")`` CORS debug hook (BaseHTTPMiddleware) with
+the pure ASGI middleware in app.core.middleware, for a small JSON
+response and for a streamed response.
+
+Usage (from backend/):
+    python -m benchmarks.bench_middleware
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.middleware import CORSDebugMiddleware, RequestIDMiddleware
+
+logger = logging.getLogger("benchmarks.middleware")
+
+STREAM_CHUNKS = 32
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for _ in range(STREAM_CHUNKS):
+                yield b"x" * 1024
+        return StreamingResponse(body(), media_type="application/octet-stream")
+
+    if stack == "base_http":
+        # The CORS debug hook as it was before it became pure ASGI
+        @app.middleware("http")
+        async def cors_debug(request: Request, call_next):
+            origin = request.headers.get("origin")
+            if origin:
+                logger.debug(f"CORS request from origin: {origin}")
+            return await call_next(request)
+    elif stack == "pure_asgi":
+        app.add_middleware(CORSDebugMiddleware)
+    elif stack == "pure_asgi_request_id":
+        app.add_middleware(CORSDebugMiddleware)
+        app.add_middleware(RequestIDMiddleware)
+    return app
+
+
+STACKS = {
+    "none": "no middleware",
+    "base_http": "@app.middleware (BaseHTTP)",
+    "pure_asgi": "pure ASGI CORS debug",
+    "pure_asgi_request_id": "pure ASGI CORS debug + request id",
+}
+
+
+def make_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"origin", b"http://localhost:3000")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+
+
+async def call(app, path: str):
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server: nothing more until the client disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    await app(make_scope(path), receive, send)
+
+
+async def measure(app, path: str, requests: int) -> float:
+    """Mean microseconds per request"""
+    for _ in range(min(200, requests)):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000)
+    args = parser.parse_args()
+
+    for path in ("/ping", "/stream"):
+        print(f"\nGET {path}")
+        print(f"  {'middleware':<36} {'µs/request':>11} {'overhead µs':>12}")
+        baseline = None
+        for stack, label in STACKS.items():
+            app = build_app(stack)
+            mean = asyncio.run(measure(app, path, args.requests))
+            baseline = mean if baseline is None else baseline
+            print(f"  {label:<36} {mean:>11.1f} {mean - baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the paginated question listing
+
+Seeds an in-memory SQLite question bank at increasing sizes and measures the
+response size and latency of ``GET /api/questions/``. Requests without
+``limit``, ``offset`` or ``after_id`` return the whole bank and are unbounded;
+the "unpaged" row shows that linear growth for comparison. Every paged
+scenario passes an explicit ``limit`` and should stay flat as the bank grows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_questions
+    python -m benchmarks.bench_questions --sizes 100 1000 100000 --repeat 50
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base, get_db
+from app.main import app
+
+TOPICS = ["Work", "Study", "Hometown", "Travel", "Technology", "Food", "Music", "Sport"]
+
+SCENARIOS = [
+    ("unpaged", {}),
+    ("first page", {"limit": 100}),
+    ("fields=id,topic", {"fields": "id,topic", "limit": 100}),
+    ("part=2, limit=20", {"part": 2, "limit": 20}),
+    ("cursor page", {"after_id": None, "limit": 100}),
+]
+
+
+def build_client(size: int) -> TestClient:
+    """Create a fresh in-memory database seeded with ``size`` questions"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    rows = [
+        {
+            "part": i % 3 + 1,
+            "topic": TOPICS[i % len(TOPICS)],
+            "question_text": f"Question {i}: describe something about {TOPICS[i % len(TOPICS)].lower()} in detail."
+        }
+        for i in range(size)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(models.Question), rows)
+
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def measure(client: TestClient, params: dict, repeat: int):
+    """Return (median ms, p95 ms, response bytes) for a scenario"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/api/questions/", params=params)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        size = len(response.content)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'scenario':<18} {'median ms':>10} {'p95 ms':>8} {'bytes':>8}")
+    print("-" * 58)
+    for size in args.sizes:
+        client = build_client(size)
+        for name, params in SCENARIOS:
+            params = dict(params)
+            if "after_id" in params:
+                # Start the cursor in the middle of the bank
+                params["after_id"] = size // 2
+            median, p95, nbytes = measure(client, params, args.repeat)
+            print(f"{size:>8}  {name:<18} {median:>10.2f} {p95:>8.2f} {nbytes:>8}")
+        print()
+
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Configurable-latency stand-ins for the external speech and LLM services
+
+The load benchmarks replace Google Speech-to-Text, local Whisper and
+Gemini with these fakes so runs are reproducible, free and independent
+of credentials, while still spending realistic time in each stage.
+"""
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+
+FAKE_TRANSCRIPTION = (
+    "Well, I really enjoy my job because it is interesting and I learn something new every day. "
+    "I work with a lot of people from different backgrounds, so I have improved my communication skills."
+)
+
+FAKE_FEEDBACK = {
+    "fluency_score": 6.5,
+    "vocabulary_score": 6.0,
+    "grammar_score": 6.0,
+    "pronunciation_score": 6.5,
+    "overall_band": 6.5,
+    "feedback": "Câu trả lời rõ ràng và có ví dụ cụ thể.",
+    "strengths": ["Trả lời đúng trọng tâm"],
+    "improvements": ["Sử dụng thêm từ vựng học thuật"],
+    "sample_corrections": [],
+}
+
+
+@dataclass
+class Latency:
+    """Latency profile of a fake service: mean seconds, +/- jitter fraction and failure rate"""
+    mean: float
+    jitter: float = 0.2
+    failure_rate: float = 0.0
+
+    def sample(self) -> float:
+        return max(0.0, self.mean * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def should_fail(self) -> bool:
+        return random.random() < self.failure_rate
+
+
+class FakeGoogleSTT:
+    """Blocking stand-in for transcribe_audio_google (runs in a worker thread)"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def __call__(self, audio_path, language_code="en-US", timeout=None):
+        delay = self.latency.sample()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Fake Google STT timed out")
+        time.sleep(delay)
+        if self.latency.should_fail():
+            raise Exception("Fake Google STT failure")
+        return FAKE_TRANSCRIPTION
+
+
+class FakeWhisper:
+    """Blocking stand-in for whisper_service.transcribe_audio (runs on the Whisper queue's threads)"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def __call__(self, audio_path, output_dir=None, timeout=None):
+        time.sleep(self.latency.sample())
+        if self.latency.should_fail():
+            raise Exception("Fake Whisper failure")
+        return FAKE_TRANSCRIPTION
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _FakeStream:
+    """Async iterator over a response split into chunks, spread over the call's latency"""
+
+    def __init__(self, text: str, delay: float, chunks: int = 4):
+        size = max(1, len(text) // chunks)
+        self._parts = [text[i:i + size] for i in range(0, len(text), size)]
+        self._delay = delay / len(self._parts)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._parts:
+            raise StopAsyncIteration
+        await asyncio.sleep(self._delay)
+        return _FakeResponse(self._parts.pop(0))
+
+
+class FakeGeminiModel:
+    """Stand-in for a Gemini GenerativeModel returning fixed, schema-valid feedback"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None, stream=False):
+        delay = self.latency.sample()
+        text = json.dumps(FAKE_FEEDBACK, ensure_ascii=False)
+        if stream:
+            if self.latency.should_fail():
+                raise Exception("Fake Gemini failure")
+            return _FakeStream(text, delay)
+        await asyncio.sleep(delay)
+        if self.latency.should_fail():
+            raise Exception("Fake Gemini failure")
+        return _FakeResponse(text)
+
+
+def install_fakes(stt: Latency, whisper: Latency, gemini: Latency):
+    """Patch the service modules so the app uses the fakes instead of the real services"""
+    from app.services import gemini_feedback_service, google_speech_service, whisper_service
+
+    google_speech_service.GOOGLE_SPEECH_AVAILABLE = True
+    google_speech_service.transcribe_audio_google = FakeGoogleSTT(stt)
+    whisper_service.transcribe_audio = FakeWhisper(whisper)
+
+    model = FakeGeminiModel(gemini)
+    gemini_feedback_service.get_gemini_client = lambda template=None: model
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Synthetic practice histories for large-scale analytics testing
+
+Generates users with multi-year practice histories: sessions with scores
+that improve over time, and the daily progress, activity calendar, part
+progress and streak rows the app would have built from them. Rows are
+written with bulk inserts: COPY on Postgres (psycopg2), executemany
+everywhere else.
+
+Usage (from backend/):
+    python -m benchmarks.synthetic_data --database-url sqlite:///synthetic.db --users 100 --sessions 1000
+    python -m benchmarks.synthetic_data --database-url postgresql://localhost/anna_bench --users 20 --sessions 10000 --years 4
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import func, insert, select
+
+from app import models
+
+TOPICS = ["Work", "Study", "Hometown", "Travel", "Technology", "Food", "Music", "Sport"]
+STRENGTHS = ["Trả lời đúng trọng tâm", "Phát âm rõ ràng", "Có ví dụ cụ thể", "Dùng từ nối tự nhiên"]
+IMPROVEMENTS = ["Mở rộng câu trả lời", "Đa dạng cấu trúc câu", "Giảm từ đệm", "Dùng thêm từ vựng học thuật"]
+
+# Rows per executemany batch
+BATCH_SIZE = 5_000
+
+
+@dataclass
+class UserHistory:
+    """All generated rows for one user, keyed by table"""
+    sessions: List[dict] = field(default_factory=list)
+    daily_progress: List[dict] = field(default_factory=list)
+    activity_calendar: List[dict] = field(default_factory=list)
+    part_progress: List[dict] = field(default_factory=list)
+    streak: Optional[dict] = None
+
+
+def _band(value: float) -> float:
+    return min(9.0, max(3.0, round(value * 2) / 2))
+
+
+def _active_days(rng: random.Random, n_sessions: int, years: float, today: date) -> List[date]:
+    """
+    Pick the days a user practised: streaks of activity separated by gaps,
+    ending either today or a few weeks ago, oldest first
+    """
+    total_days = max(1, int(years * 365))
+    # Heavy users practise several times a day, light users about once
+    per_day = rng.uniform(1.0, 4.0) if n_sessions > 50 else rng.uniform(1.0, 1.5)
+    wanted = min(total_days, max(1, math.ceil(n_sessions / per_day)))
+
+    # Most users were active recently; some lapsed a while ago
+    end = today - timedelta(days=rng.choice([0, 0, 0, 1, 2, rng.randint(3, 60)]))
+    days = []
+    day = end
+    while len(days) < wanted and (today - day).days < total_days:
+        run = min(wanted - len(days), max(1, int(rng.expovariate(1 / 6))))
+        for _ in range(run):
+            days.append(day)
+            day -= timedelta(days=1)
+        # Gaps get longer the sparser the history is
+        sparsity = total_days / wanted
+        day -= timedelta(days=1 + int(rng.expovariate(1 / max(1.0, sparsity))))
+    return sorted(days)
+
+
+def _streaks(days: List[date]) -> tuple:
+    """(current streak ending at the last active day, longest streak)"""
+    longest = current = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def generate_history(
+    rng: random.Random,
+    user_id: int,
+    n_sessions: int,
+    years: float,
+    questions: Dict[int, List[int]],
+    today: Optional[date] = None
+) -> UserHistory:
+    """Generate a consistent practice history of ``n_sessions`` sessions for one user"""
+    today = today or date.today()
+    history = UserHistory()
+    if n_sessions <= 0:
+        return history
+
+    days = _active_days(rng, n_sessions, years, today)
+    # Every active day gets one session, the rest land on random active days
+    per_day = Counter(days)
+    per_day.update(rng.choices(days, k=max(0, n_sessions - len(days))))
+
+    start_band = rng.uniform(4.5, 6.0)
+    gain = rng.uniform(0.5, 1.5)
+    parts = Counter()
+    index = 0
+    for day in days:
+        count = per_day[day]
+        for _ in range(count):
+            progress = index / max(1, n_sessions - 1)
+            overall = start_band + gain * progress + rng.gauss(0, 0.4)
+            part = rng.choices([1, 2, 3], weights=[5, 3, 2])[0]
+            parts[part] += 1
+            created = datetime(day.year, day.month, day.day, rng.randint(6, 23), rng.randint(0, 59))
+            history.sessions.append({
+                "user_id": user_id,
+                "question_id": rng.choice(questions[part]),
+                "part": part,
+                "audio_url": f"/uploads/audio/{uuid.UUID(int=rng.getrandbits(128))}.webm",
+                "transcription": "Synthetic answer used for load testing.",
+                "fluency_score": _band(overall + rng.gauss(0, 0.3)),
+                "vocabulary_score": _band(overall + rng.gauss(0, 0.3)),
+                "grammar_score": _band(overall + rng.gauss(0, 0.3)),
+                "pronunciation_score": _band(overall + rng.gauss(0, 0.3)),
+                "overall_band": _band(overall),
+                "feedback": "Phản hồi tổng hợp cho dữ liệu thử nghiệm.",
+                "feedback_strengths": json.dumps(rng.sample(STRENGTHS, 2), ensure_ascii=False),
+                "feedback_improvements": json.dumps(rng.sample(IMPROVEMENTS, 2), ensure_ascii=False),
+                "feedback_corrections": "[]",
+                "created_at": created,
+            })
+            index += 1
+        history.daily_progress.append({"user_id": user_id, "date": day, "practice_count": count, "target_count": 25})
+        history.activity_calendar.append({"user_id": user_id, "date": day, "practice_count": count})
+
+    history.part_progress = [
+        {"user_id": user_id, "part": part, "completed_count": parts[part], "total_count": len(questions[part])}
+        for part in sorted(parts)
+    ]
+    current, longest = _streaks(days)
+    history.streak = {
+        "user_id": user_id,
+        "current_streak": current,
+        "longest_streak": longest,
+        "frozen_streak": 0,
+        "last_activity_date": days[-1],
+    }
+    return history
+
+
+def _copy_rows(conn, table, rows: List[dict]):
+    """COPY rows into a Postgres table through psycopg2"""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([r"\N" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def bulk_insert(conn, table, rows: List[dict]):
+    """Insert many rows at once: COPY on psycopg2, batched executemany otherwise"""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        _copy_rows(conn, table, rows)
+        return
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def ensure_questions(conn, per_part: int = 100) -> Dict[int, List[int]]:
+    """Make sure every part has questions to practise; return question ids per part"""
+    counts = dict(conn.execute(
+        select(models.Question.part, func.count()).group_by(models.Question.part)
+    ).all())
+    missing = [
+        {"part": part, "topic": TOPICS[i % len(TOPICS)],
+         "question_text": f"Synthetic part {part} question {i} about {TOPICS[i % len(TOPICS)].lower()}."}
+        for part in (1, 2, 3)
+        for i in range(counts.get(part, 0), per_part)
+    ]
+    bulk_insert(conn, models.Question.__table__, missing)
+
+    questions = {1: [], 2: [], 3: []}
+    for question_id, part in conn.execute(select(models.Question.id, models.Question.part)):
+        questions[part].append(question_id)
+    return questions
+
+
+def create_users(conn, count: int, password_hash: Optional[str] = None, prefix: str = "synthetic") -> List[int]:
+    """Insert ``count`` users with unique names; return their ids"""
+    run_id = uuid.uuid4().hex[:8]
+    names = [f"{prefix}_{run_id}_{i}" for i in range(count)]
+    bulk_insert(conn, models.User.__table__, [
+        {"username": name, "email": f"{name}@example.com", "password_hash": password_hash, "is_premium": False}
+        for name in names
+    ])
+    rows = conn.execute(select(models.User.username, models.User.id).where(models.User.username.in_(names)))
+    ids = dict(rows.all())
+    return [ids[name] for name in names]
+
+
+def write_history(conn, history: UserHistory):
+    bulk_insert(conn, models.PracticeSession.__table__, history.sessions)
+    bulk_insert(conn, models.DailyProgress.__table__, history.daily_progress)
+    bulk_insert(conn, models.ActivityCalendar.__table__, history.activity_calendar)
+    bulk_insert(conn, models.PartProgress.__table__, history.part_progress)
+    if history.streak:
+        bulk_insert(conn, models.Streak.__table__, [history.streak])
+
+
+def generate(
+    engine,
+    users: int,
+    sessions_per_user: int,
+    years: float = 3.0,
+    seed: int = 42,
+    password_hash: Optional[str] = None
+) -> List[int]:
+    """Create ``users`` users with ``sessions_per_user`` sessions each; return the user ids"""
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        questions = ensure_questions(conn)
+        user_ids = create_users(conn, users, password_hash)
+    # One transaction per user keeps memory flat for large runs
+    for user_id in user_ids:
+        history = generate_history(rng, user_id, sessions_per_user, years, questions)
+        with engine.begin() as conn:
+            write_history(conn, history)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=1_000, help="Sessions per user")
+    parser.add_argument("--years", type=float, default=3.0, help="How far back histories reach")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+
+    from app.database import Base
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    start = time.perf_counter()
+    user_ids = generate(engine, args.users, args.sessions, args.years, args.seed)
+    elapsed = time.perf_counter() - start
+    total = len(user_ids) * args.sessions
+    print(f"Created {len(user_ids)} users and {total} sessions in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} sessions/s)")
+
+
+if __name__ == "__main__":
+    main()
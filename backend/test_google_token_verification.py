@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test local Google ID token verification against a fake key server
+
+Starts a local HTTP server that serves a JWKS like
+https://www.googleapis.com/oauth2/v3/certs, signs ID tokens with the
+matching private key and checks that the backend verifies them without
+calling Google.
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.core.config import settings
+from app.core.http import close_http_client
+from app.services import google_token_service
+
+CLIENT_ID = "test-client-id.apps.googleusercontent.com"
+
+
+def generate_key(kid: str):
+    """Generate an RSA key pair; returns (private PEM, public JWK dict)"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    public_jwk = jwk.construct(public_pem, algorithm="RS256").to_dict()
+    public_jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private_pem, public_jwk
+
+
+class FakeKeyServer:
+    """Serves a JWKS with a Cache-Control header and counts requests"""
+
+    def __init__(self, max_age: int = 3600):
+        self.keys = []
+        self.max_age = max_age
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = json.dumps({"keys": server.keys}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}, must-revalidate")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/oauth2/v3/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+
+
+def make_token(private_pem: str, kid: str, **overrides) -> str:
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "student@example.com",
+        "email_verified": True,
+        "name": "Test Student",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": kid})
+
+
+async def expect_error(coro, error_type) -> bool:
+    try:
+        await coro
+    except error_type:
+        return True
+    return False
+
+
+async def run_checks(server: FakeKeyServer):
+    results = []
+    private_pem, public_jwk = generate_key("key-1")
+    server.keys = [public_jwk]
+    settings.GOOGLE_CERTS_URL = server.url
+    google_token_service.get_key_cache().clear()
+
+    # Valid token is verified locally and keys are fetched once
+    claims = await google_token_service.verify_id_token(make_token(private_pem, "key-1"), CLIENT_ID)
+    await google_token_service.verify_id_token(make_token(private_pem, "key-1"), CLIENT_ID)
+    results.append(("Valid token verified", claims["email"] == "student@example.com"))
+    results.append(("Keys cached per Cache-Control", server.requests == 1))
+
+    # Wrong audience, issuer, expiry and signature are rejected
+    results.append(("Wrong audience rejected", await expect_error(
+        google_token_service.verify_id_token(make_token(private_pem, "key-1", aud="other"), CLIENT_ID),
+        google_token_service.GoogleTokenError
+    )))
+    results.append(("Wrong issuer rejected", await expect_error(
+        google_token_service.verify_id_token(make_token(private_pem, "key-1", iss="evil.example.com"), CLIENT_ID),
+        google_token_service.GoogleTokenError
+    )))
+    results.append(("Expired token rejected", await expect_error(
+        google_token_service.verify_id_token(make_token(private_pem, "key-1", exp=int(time.time()) - 60), CLIENT_ID),
+        google_token_service.GoogleTokenError
+    )))
+    other_pem, _ = generate_key("key-1")
+    results.append(("Bad signature rejected", await expect_error(
+        google_token_service.verify_id_token(make_token(other_pem, "key-1"), CLIENT_ID),
+        google_token_service.GoogleTokenError
+    )))
+
+    # Unknown kids right after a fetch are rejected without refetching
+    forged_pem, _ = generate_key("forged")
+    requests_before = server.requests
+    rejected = all([
+        await expect_error(
+            google_token_service.verify_id_token(make_token(forged_pem, "forged"), CLIENT_ID),
+            google_token_service.GoogleTokenError
+        )
+        for _ in range(3)
+    ])
+    results.append(("Unknown kid refetch rate-limited", rejected and server.requests == requests_before))
+
+    # Key rotation: an unknown kid triggers one refresh once the interval has passed
+    min_refresh = settings.GOOGLE_KEYS_MIN_REFRESH_SECONDS
+    settings.GOOGLE_KEYS_MIN_REFRESH_SECONDS = 0
+    rotated_pem, rotated_jwk = generate_key("key-2")
+    server.keys = [public_jwk, rotated_jwk]
+    requests_before = server.requests
+    claims = await google_token_service.verify_id_token(make_token(rotated_pem, "key-2"), CLIENT_ID)
+    results.append(("Rotated key fetched on unknown kid", claims["sub"] == "1234567890" and server.requests == requests_before + 1))
+    settings.GOOGLE_KEYS_MIN_REFRESH_SECONDS = min_refresh
+
+    # Expired key set is refreshed
+    server.max_age = 0
+    google_token_service.get_key_cache().clear()
+    await google_token_service.verify_id_token(make_token(private_pem, "key-1"), CLIENT_ID)
+    requests_before = server.requests
+    await google_token_service.verify_id_token(make_token(private_pem, "key-1"), CLIENT_ID)
+    results.append(("Key set refreshed after max-age", server.requests == requests_before + 1))
+
+    await close_http_client()
+    return results
+
+
+def test_google_token_verification():
+    server = FakeKeyServer()
+    try:
+        results = asyncio.run(run_checks(server))
+    finally:
+        server.stop()
+    failed = [name for name, passed in results if not passed]
+    assert not failed, f"Failed checks: {failed}"
+
+
+def main():
+    print("=" * 60)
+    print("Google ID Token Verification Test (local key server)")
+    print("=" * 60)
+
+    server = FakeKeyServer()
+    try:
+        results = asyncio.run(run_checks(server))
+    finally:
+        server.stop()
+
+    for name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    if all(passed for _, passed in results):
+        print("\n✅ All tests passed! Google tokens are verified locally.")
+        return 0
+    print("\n❌ Some tests failed.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Import-time budget test
+
+Fails if importing app.main loads the Google Speech / Gemini SDKs (they
+must load on first use) or takes longer than IMPORT_TIME_BUDGET_MS.
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmarks.bench_import import IMPORT_TIME_BUDGET_MS, best_of
+
+
+def test_import_time():
+    result = best_of(runs=3)
+    assert not result["lazy_modules_loaded"], \
+        f"Imported at startup but should load lazily: {result['lazy_modules_loaded']}"
+    assert result["total_ms"] <= IMPORT_TIME_BUDGET_MS, \
+        f"import app.main took {result['total_ms']:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+
+
+def main():
+    print("=" * 60)
+    print("Import Time Budget Test")
+    print("=" * 60)
+    try:
+        test_import_time()
+    except AssertionError as e:
+        print(f"✗ FAIL: {e}")
+        return 1
+    print("✓ PASS: app.main imports within budget without the lazy SDKs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,15 +28,14 @@ export default function Home() {
     const fetchProgress = async () => {
       try {
         setLoading(true);
-        const [daily, streakData, partData, analyticsData] = await Promise.all([
-          api.get('/api/progress/daily'),
-          api.get('/api/progress/streak'),
-          api.get('/api/progress/part-progress'),
+        // One request for daily/streak/part progress; revalidates with a 304 when unchanged
+        const [dashboard, analyticsData] = await Promise.all([
+          api.get('/api/progress/dashboard'),
           api.get('/api/progress/streak-analytics').catch(() => ({ data: { yearly_heatmap: [] } })),
         ]);
-        setDailyProgress(daily.data);
-        setStreak(streakData.data);
-        setPartProgress(partData.data);
+        setDailyProgress(dashboard.data.daily);
+        setStreak(dashboard.data.streak);
+        setPartProgress(dashboard.data.part_progress);
         setYearlyHeatmap(analyticsData.data?.yearly_heatmap || []);
         // Also set activityCalendar for backward compatibility
         setActivityCalendar(analyticsData.data?.yearly_heatmap?.map((item: { date: string; practice_count: number }) => ({
@@ -6,6 +6,9 @@ import { useState, useEffect } from 'react';
 import { useSearchParams } from 'next/navigation';
 import api from '@/lib/api';
 
+// Questions fetched per page; more are loaded on demand
+const QUESTIONS_PAGE_SIZE = 100;
+
 interface Question {
   id: number;
   part: number;
@@ -24,6 +27,8 @@ export default function PracticePage() {
   const [questions, setQuestions] = useState<Question[]>([]);
   const [topics, setTopics] = useState<string[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchQuestions();
@@ -31,16 +36,22 @@ export default function PracticePage() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [activeTab]);
 
+  const fetchQuestionPage = async (afterId?: string) => {
+    const endpoint = custom
+      ? '/api/questions/user-questions'
+      : '/api/questions';
+    const response = await api.get(endpoint, {
+      params: { part: activeTab, limit: QUESTIONS_PAGE_SIZE, after_id: afterId },
+    });
+    // The API sets X-Next-Cursor only when there may be more rows
+    setNextCursor(response.headers['x-next-cursor']);
+    return response.data as Question[];
+  };
+
   const fetchQuestions = async () => {
     try {
       setLoading(true);
-      const endpoint = custom
-        ? '/api/questions/user-questions'
-        : '/api/questions';
-      const response = await api.get(endpoint, {
-        params: { part: activeTab },
-      });
-      setQuestions(response.data);
+      setQuestions(await fetchQuestionPage());
     } catch (error) {
       console.error('Error fetching questions:', error);
     } finally {
@@ -48,6 +59,19 @@ export default function PracticePage() {
     }
   };
 
+  const loadMoreQuestions = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await fetchQuestionPage(nextCursor);
+      setQuestions((prev) => [...prev, ...page]);
+    } catch (error) {
+      console.error('Error fetching questions:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchTopics = async () => {
     try {
       const response = await api.get('/api/questions/topics', {
@@ -185,6 +209,17 @@ export default function PracticePage() {
                   </button>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="text-center">
+                  <button
+                    onClick={loadMoreQuestions}
+                    disabled={loadingMore}
+                    className="px-6 py-2 bg-white text-gray-700 rounded-lg font-medium hover:bg-gray-50 transition-colors disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Đang tải...' : 'Xem thêm câu hỏi'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -6,6 +6,20 @@ import api from '@/lib/api';
 import { PracticeSession, Question } from '@/lib/types';
 import { ERROR_MESSAGES } from '@/lib/constants';
 
+// One Idempotency-Key per recording, so resubmitting the same blob never analyzes it twice
+const idempotencyKeys = new WeakMap<Blob, string>();
+
+function idempotencyKeyFor(audioBlob: Blob): string {
+  let key = idempotencyKeys.get(audioBlob);
+  if (!key) {
+    key = typeof crypto !== 'undefined' && 'randomUUID' in crypto
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    idempotencyKeys.set(audioBlob, key);
+  }
+  return key;
+}
+
 export function usePracticeSubmission() {
   const [submitting, setSubmitting] = useState(false);
   const [analyzing, setAnalyzing] = useState(false);
@@ -35,6 +49,7 @@ export function usePracticeSubmission() {
       const response = await api.post('/api/practice/analyze', formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
+          'Idempotency-Key': idempotencyKeyFor(audioBlob),
         },
       });
 